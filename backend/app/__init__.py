@@ -1,19 +1,117 @@
-from flask import Flask
+import gc
+import os
+import time
+from flask import Flask, Response, g, request
 from flask_cors import CORS
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# When this process started serving: import time, or the fork for a pre-forked worker
+_process_started = time.perf_counter()
+# Process whose background threads are running; threads don't survive a fork
+_background_pid = None
+_first_request_pending = True
+
+
+def _after_fork():
+    global _process_started, _first_request_pending
+    _process_started = time.perf_counter()
+    _first_request_pending = True
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_after_fork)
+
+
+def warmup():
+    """Load the game corpus and per-game solver data into this process.
+
+    Meant to run once before a pre-forking server starts its workers (see
+    gunicorn.conf.py), so they all share the loaded games, board shapes,
+    index tables and opening-board rankings copy-on-write instead of each
+    building its own. Returns counts of what was loaded.
+    """
+    from app.routes.games import warm_caches
+    from app.services.metrics import startup_seconds
+
+    started = time.perf_counter()
+    loaded = warm_caches(suggestions=os.getenv('WARMUP_SUGGESTIONS', '1') == '1')
+    # Keep the collector from touching, and so copying, every object loaded so far
+    if hasattr(gc, 'freeze'):
+        gc.freeze()
+    startup_seconds['warmup'] = time.perf_counter() - started
+    return loaded
+
+
+def start_background():
+    """Start this process's background threads: the game index refresh and the random game pool refill.
+
+    Runs on each process's first request rather than at start-up, so a
+    parent that forks workers never holds threads or locks its children
+    would inherit half-finished.
+    """
+    global _background_pid
+    if _background_pid == os.getpid():
+        return
+    _background_pid = os.getpid()
+
+    from app.services.storage import storage
+    from app.services.random_pool import random_game_pool
+    storage.start_index_refresh()
+    random_game_pool.refill_async()
+
+
 def create_app():
+    started = time.perf_counter()
     app = Flask(__name__)
-    CORS(app)
+    CORS(app, expose_headers=['X-Next-Cursor', 'Server-Timing'])
 
     # Blueprints
     from app.routes.games import games_bp
     app.register_blueprint(games_bp, url_prefix='/api/games')
 
+    from app.services import metrics
+    metrics.startup_seconds['import'] = time.perf_counter() - started
+
+    if os.getenv('APP_WARMUP') == '1':
+        warmup()
+    elif os.getenv('GAME_CACHE_PREFETCH') == '1':
+        from app.services.storage import storage
+        storage.prefetch()
+
+    @app.before_request
+    def start_timing():
+        start_background()
+        g.request_started = time.perf_counter()
+        g.timings_token = metrics.start_request()
+
+    @app.after_request
+    def add_server_timing(response):
+        global _first_request_pending
+        if 'timings_token' not in g:
+            return response
+        finished = time.perf_counter()
+        total = finished - g.request_started
+        timings = metrics.end_request(g.pop('timings_token'))
+        response.headers['Server-Timing'] = metrics.server_timing(timings, total)
+        # Lets cross-origin pages read the header, as they can X-Next-Cursor
+        response.headers['Timing-Allow-Origin'] = '*'
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.request_seconds.observe(total, method=request.method, endpoint=endpoint, status=response.status_code)
+        if _first_request_pending:
+            _first_request_pending = False
+            metrics.startup_seconds['first_request'] = total
+            metrics.startup_seconds['until_first_request'] = finished - _process_started
+        return response
+
+    @app.route('/api/metrics')
+    def get_metrics():
+        return Response(metrics.registry.render(), mimetype='text/plain; version=0.0.4')
+
     @app.route('/api/health')
     def health_check():
-        return {'status': 'healthy'}
+        return {'status': 'healthy', 'startup_seconds': dict(metrics.startup_seconds)}
 
+    metrics.startup_seconds['create_app'] = time.perf_counter() - started
     return app
@@ -1,30 +1,86 @@
 from flask import Blueprint, jsonify, request
-from app.services.dynamo_service import dynamo_service
-from app.services.ai_solver import ai_solver
+from app.services.storage import storage
+from app.services.ai_solver import ai_solver, guess_mask, MAX_ENUMERATED_COMBOS, PARTITION_MAX_WORDS
+from app.services.suggestion_cache import suggestion_cache
+from app.services.random_pool import random_game_pool
+from app.services.solve_sessions import solve_sessions
+from app.services.precompute import precomputer
+from app.services.metrics import registry, timed
+import math
+import os
 import random
+import time
 
 games_bp = Blueprint('games', __name__)
 
+DEFAULT_SUGGESTION_LIMIT = 5
+MAX_SUGGESTION_LIMIT = 100
+SOLVE_BATCH_MAX_ITEMS = int(os.getenv('SOLVE_BATCH_MAX_ITEMS', 100))
+DEFAULT_AUTOSOLVE_TRIES = 100
+MAX_AUTOSOLVE_TRIES = 1000
+SOLVE_MODES = ('greedy', 'partition')
+# Seconds a board too large to enumerate may spend searching for its suggestions
+SOLVE_SEARCH_BUDGET = float(os.getenv('SOLVE_SEARCH_BUDGET', 0.5))
+# Deepest cursor /solve serves on searched boards; each page searches everything above it again
+MAX_SEARCH_CURSOR = int(os.getenv('MAX_SEARCH_CURSOR', 200))
+# Seconds a whole /autosolve may spend; the guesses made so far are returned when it runs out
+AUTOSOLVE_BUDGET = float(os.getenv('AUTOSOLVE_BUDGET', 2.0))
+
+# game_id -> (board size, group size), so /check and /solve can map indices without reading the game
+_board_shapes = {}
+
+def _cache_samples(stats, results):
+    return [({"result": result}, stats[key]) for result, key in results]
+
+registry.collect('nytc_suggestion_cache_requests_total', 'Suggestion cache lookups by result.', 'counter',
+                 lambda: _cache_samples(suggestion_cache.stats(), [('hit', 'hits'), ('miss', 'misses'), ('coalesced', 'coalesced')]))
+registry.collect('nytc_suggestion_cache_hit_ratio', 'Share of suggestion cache lookups served from the cache.', 'gauge',
+                 lambda: [({}, suggestion_cache.stats()['hit_rate'])])
+registry.collect('nytc_suggestion_cache_bytes', 'Estimated size of the cached rankings.', 'gauge',
+                 lambda: [({}, suggestion_cache.stats()['bytes'])])
+registry.collect('nytc_suggestion_cache_evictions_total', 'Rankings evicted from the suggestion cache.', 'counter',
+                 lambda: [({}, suggestion_cache.stats()['evictions'])])
+registry.collect('nytc_random_pool_requests_total', 'Random game requests by whether the pool had a game ready.', 'counter',
+                 lambda: _cache_samples(random_game_pool.stats(), [('hit', 'hits'), ('miss', 'misses')]))
+registry.collect('nytc_random_pool_ready', 'Games waiting in the random game pool.', 'gauge',
+                 lambda: [({}, random_game_pool.stats()['ready'])])
+registry.collect('nytc_precompute_jobs_total', 'Speculative opening-board rankings by what became of them.', 'counter',
+                 lambda: [({"result": result}, count) for result, count in precomputer.stats()['jobs'].items()])
+registry.collect('nytc_precompute_claims_total', 'Opening-board solves by whether a speculative ranking was ready.', 'counter',
+                 lambda: [({"result": result}, count) for result, count in precomputer.stats()['claims'].items()])
+registry.collect('nytc_precompute_hit_ratio', 'Share of opening-board solves that found their speculative ranking ready.', 'gauge',
+                 lambda: [({}, precomputer.stats()['hit_rate'])])
+registry.collect('nytc_solve_sessions_active', 'Open solve sessions.', 'gauge',
+                 lambda: [({}, solve_sessions.stats()['active'])])
+registry.collect('nytc_solve_sessions_bytes', 'Estimated size of the open solve sessions\' rankings.', 'gauge',
+                 lambda: [({}, solve_sessions.stats()['bytes'])])
+registry.collect('nytc_solve_sessions_evictions_total', 'Solve sessions evicted to stay within the session limits.', 'counter',
+                 lambda: [({}, solve_sessions.stats()['evictions'])])
+
 @games_bp.route('/random', methods=['GET'])
 def get_random_game():
-    game = dynamo_service.get_random_game()
+    game = random_game_pool.take()
     if not game:
         return jsonify({"error": "No games found"}), 404
     
+    precompute_opening(game)
     return prepare_game_response(game)
 
 @games_bp.route('/<int:game_id>', methods=['GET'])
 def get_game(game_id):
-    game = dynamo_service.get_game(game_id)
+    with timed('storage'):
+        game = storage.get_game(game_id)
     if not game:
         return jsonify({"error": "Game not found"}), 404
     
+    precompute_opening(game)
     return prepare_game_response(game)
 
 def prepare_game_response(game):
+    size, group_size = remember_shape(game)
     seed = random.randint(0, 1000000)
     rng = random.Random(seed)
-    indices = list(range(16))
+    indices = list(range(size))
     rng.shuffle(indices)
     
     shuffled_words = [game['words'][i] for i in indices]
@@ -32,89 +88,480 @@ def prepare_game_response(game):
     return jsonify({
         "game_number": game['game_number'],
         "words": shuffled_words,
-        "seed": seed
+        "seed": seed,
+        "group_size": group_size
     })
 
-def get_permutation(seed):
+def precompute_opening(game):
+    """Rank the game's full board in the background, so the /solve that usually follows finds it cached.
+
+    Dropped when the precompute queue is full; boards too large to rank are
+    searched per request instead and are skipped.
+    """
+    game_id = int(game['game_number'])
+    size, group_size = remember_shape(game)
+    if math.comb(size, group_size) > MAX_ENUMERATED_COMBOS:
+        return
+    available = list(range(size))
+
+    def compute():
+        with timed('precompute'):
+            suggestion_cache.get_ranked(game_id, available, lambda: ai_solver.rank(
+                game['adjacency_matrix'], available, group_size=group_size), warm=True)
+
+    precomputer.submit(suggestion_cache.key(game_id, available), compute,
+                       cached=suggestion_cache.contains(game_id, available))
+
+def get_permutation(seed, size=16):
     rng = random.Random(seed)
-    indices = list(range(16))
+    indices = list(range(size))
     rng.shuffle(indices)
     return indices
 
+def remember_shape(game):
+    """(board size, group size) of a game; groups are consecutive runs of group_size word indices."""
+    shape = (len(game['words']), game.get('group_size', 4))
+    _board_shapes[game['game_number']] = shape
+    return shape
+
+def board_shape(game_id, games=None):
+    """(board size, group size) for game_id, reading the game only the first time; None if it does not exist."""
+    shape = _board_shapes.get(game_id)
+    if shape is not None:
+        return shape
+    game = games.get(game_id) if games else None
+    if game is None:
+        with timed('storage'):
+            game = storage.get_game(game_id)
+    if not game:
+        return None
+    return remember_shape(game)
+
 @games_bp.route('/<int:game_id>/check', methods=['POST'])
 def check_guess(game_id):
     data = request.json
     guess_indices = data.get('guess_indices', [])
     seed = data.get('seed')
     
-    if len(guess_indices) != 4 or seed is None:
+    shape = board_shape(game_id)
+    if shape is None:
+        return jsonify({"error": "Game not found"}), 404
+    size, group_size = shape
+    if len(guess_indices) != group_size or seed is None:
         return jsonify({"error": "Invalid request"}), 400
         
-    perm = get_permutation(seed)
+    perm = get_permutation(seed, size)
     
     # Map shuffled indices to original indices
-    original_indices = [perm[i] for i in guess_indices]
-    original_indices.sort()
-    
-    # Check groups
-    group_ranges = {
-        0: [0, 1, 2, 3],
-        1: [4, 5, 6, 7],
-        2: [8, 9, 10, 11],
-        3: [12, 13, 14, 15],
-    }
-    matched_group = None
-    for group_num, group_indices in group_ranges.items():
-        if original_indices == group_indices:
-            matched_group = group_num
-            break
+    try:
+        original_indices = to_original(perm, guess_indices)
+    except (TypeError, ValueError):
+        return jsonify({"error": "Invalid request"}), 400
 
+    result, matched_group = grade_guess(original_indices, group_size)
     if matched_group is not None:
-        return jsonify({"result": 1, "group": matched_group})
-    else:
-        counts = {0:0, 1:0, 2:0, 3:0}
-        for idx in original_indices:
-            counts[idx // 4] += 1
-        if 3 in counts.values():
-            result = 0
-        else:
-            result = -1
-
+        return jsonify({"result": result, "group": matched_group})
     return jsonify({"result": result})
 
+def grade_guess(original_indices, group_size=4):
+    """(1, group) for a whole group, (0, None) when one away, otherwise (-1, None)."""
+    # Group n is the original indices n * group_size up to (n + 1) * group_size
+    counts = {}
+    for idx in original_indices:
+        counts[idx // group_size] = counts.get(idx // group_size, 0) + 1
+    group_num, hits = max(counts.items(), key=lambda item: item[1])
+    if hits == group_size and len(set(original_indices)) == group_size:
+        return 1, group_num
+    if hits == group_size - 1:
+        return 0, None
+    return -1, None
+
 @games_bp.route('/<int:game_id>/solve', methods=['POST'])
 def solve_game(game_id):
-    data = request.json
-    available_indices_shuffled = data.get('available_indices', [])
-    bad_guesses_shuffled = data.get('bad_guesses', [])
+    shape = board_shape(game_id)
+    if shape is None:
+        return jsonify({"error": "Game not found"}), 404
+    try:
+        board = parse_solve_request(request.json, shape)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    result = solve_board(game_id, board)
+    if result is None:
+        return jsonify({"error": "Game not found"}), 404
+    suggestions, next_cursor = result
+
+    with timed('serialize'):
+        response = jsonify(suggestions)
+    # The body stays a plain list; the offset of the next page, if any, rides in a header
+    if next_cursor is not None:
+        response.headers['X-Next-Cursor'] = str(next_cursor)
+    return response
+
+@games_bp.route('/<int:game_id>/autosolve', methods=['POST'])
+def autosolve_game(game_id):
+    """Let the AI play the whole game in-process and return every guess it made."""
+    data = request.json or {}
     seed = data.get('seed')
-    
+    max_tries = data.get('max_tries', DEFAULT_AUTOSOLVE_TRIES)
     if seed is None:
         return jsonify({"error": "Missing seed"}), 400
-        
-    perm = get_permutation(seed)
-    available_indices_original = [perm[i] for i in available_indices_shuffled]
-    
-    # Convert bad guesses to original indices
-    bad_guesses_original = []
-    for guess in bad_guesses_shuffled:
-        bad_guesses_original.append(tuple(sorted([perm[i] for i in guess])))
+    if not isinstance(max_tries, int) or not 1 <= max_tries <= MAX_AUTOSOLVE_TRIES:
+        return jsonify({"error": f"max_tries must be between 1 and {MAX_AUTOSOLVE_TRIES}"}), 400
 
-    game = dynamo_service.get_game(game_id)
+    with timed('storage'):
+        game = storage.get_game(game_id)
     if not game:
         return jsonify({"error": "Game not found"}), 404
-        
-    matrix = game['adjacency_matrix']
-    suggestions = ai_solver.generate_suggestions(matrix, available_indices_original, bad_guesses_original)
-    
-    inv_perm = {original: shuffled for shuffled, original in enumerate(perm)}
-    
+
+    size, group_size = remember_shape(game)
+    started = time.perf_counter()
+    with timed('solve'):
+        trajectory, complete = ai_solver.autosolve_within(game['adjacency_matrix'], max_tries, group_size,
+                                                          AUTOSOLVE_BUDGET)
+    elapsed = time.perf_counter() - started
+
+    inv_perm = {original: shuffled for shuffled, original in enumerate(get_permutation(seed, size))}
+    guesses = []
+    for step in trajectory:
+        guess = {
+            "words": [inv_perm[w] for w in step['words']],
+            "score": step['score'],
+            "result": step['result']
+        }
+        if step['group'] is not None:
+            guess["group"] = step['group']
+        guesses.append(guess)
+
+    groups_found = sum(1 for step in trajectory if step['group'] is not None)
+    return jsonify({
+        "game_number": game_id,
+        "trajectory": guesses,
+        "stats": {
+            "tries": len(trajectory),
+            "solved": groups_found == size // group_size,
+            "groups_found": groups_found,
+            "misses": len(trajectory) - groups_found,
+            "one_away": sum(1 for step in trajectory if step['result'] == 0),
+            "stopped_early": not complete,
+            "solve_ms": round(elapsed * 1000, 3)
+        }
+    })
+
+def valid_game_id(game_id):
+    # Game numbers start at 0; -1 is the table's metadata item, and JSON booleans are not ids
+    return type(game_id) is int and game_id >= 0
+
+@games_bp.route('/solve/batch', methods=['POST'])
+def solve_batch():
+    items = (request.json or {}).get('items')
+    if not isinstance(items, list):
+        return jsonify({"error": "Missing items"}), 400
+    if len(items) > SOLVE_BATCH_MAX_ITEMS:
+        return jsonify({"error": f"At most {SOLVE_BATCH_MAX_ITEMS} items per batch"}), 400
+
+    # Board shapes first: one bulk read for the games not seen by this process yet
+    game_ids = {item['game_id'] for item in items if isinstance(item, dict) and valid_game_id(item.get('game_id'))}
+    unknown = {game_id for game_id in game_ids if game_id not in _board_shapes}
+    with timed('storage'):
+        games = storage.get_games(unknown) if unknown else {}
+    for game in games.values():
+        remember_shape(game)
+
+    boards = []
+    for item in items:
+        try:
+            if not isinstance(item, dict) or not valid_game_id(item.get('game_id')):
+                raise ValueError("Missing game_id")
+            shape = _board_shapes.get(item['game_id'])
+            boards.append((item['game_id'], parse_solve_request(item, shape) if shape else None))
+        except ValueError as e:
+            boards.append(e)
+
+    # Then one more for every game whose board is not already ranked in the cache
+    missing = {
+        game_id for game_id, board in (b for b in boards if not isinstance(b, ValueError) and b[1])
+        if game_id not in games
+        and not suggestion_cache.contains(game_id, board['available_indices'], cache_variant(board['mode'], board['bad_guess_masks']))
+    }
+    if missing:
+        with timed('storage'):
+            games.update(storage.get_games(missing))
+
+    results = []
+    for board in boards:
+        if isinstance(board, ValueError):
+            results.append({"error": str(board), "status": 400})
+            continue
+        game_id, board = board
+        result = solve_board(game_id, board, games) if board else None
+        if result is None:
+            results.append({"error": "Game not found", "status": 404})
+            continue
+        suggestions, next_cursor = result
+        results.append({"suggestions": suggestions, "next_cursor": next_cursor})
+
+    with timed('serialize'):
+        return jsonify({"results": results})
+
+@games_bp.route('/<int:game_id>/session', methods=['POST'])
+def create_session(game_id):
+    """Start a solve session; later guesses only send the session token and the guessed indices."""
+    data = request.json or {}
+    try:
+        if data.get('seed') is None:
+            raise ValueError("Missing seed")
+        cursor, limit = parse_page(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    shape = board_shape(game_id)
+    if shape is None:
+        return jsonify({"error": "Game not found"}), 404
+    size, group_size = shape
+    if math.comb(size, group_size) > MAX_ENUMERATED_COMBOS:
+        return jsonify({"error": "Board too large for a solve session"}), 400
+
+    ranked = get_ranked_suggestions(game_id, list(range(size)), group_size=group_size)
+    if ranked is None:
+        return jsonify({"error": "Game not found"}), 404
+
+    session = solve_sessions.create(game_id, get_permutation(data['seed'], size), ranked, group_size)
+    return jsonify(session_response(session, cursor, limit))
+
+@games_bp.route('/session/<token>', methods=['GET'])
+def get_session(token):
+    session = solve_sessions.get(token)
+    if session is None:
+        return jsonify({"error": "Session not found"}), 404
+    try:
+        cursor, limit = parse_page({key: request.args.get(key, type=int) for key in ('cursor', 'limit') if key in request.args})
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    with session.lock:
+        return jsonify(session_response(session, cursor, limit))
+
+@games_bp.route('/session/<token>/guess', methods=['POST'])
+def session_guess(token):
+    """Grade a guess, fold it into the session, and return the updated suggestions."""
+    session = solve_sessions.get(token)
+    if session is None:
+        return jsonify({"error": "Session not found"}), 404
+
+    data = request.json or {}
+    guess_indices = data.get('guess_indices', [])
+    try:
+        _, limit = parse_page(data)
+        if len(guess_indices) != session.group_size or not all(isinstance(i, int) and 0 <= i < len(session.perm) for i in guess_indices):
+            raise ValueError("Invalid request")
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+
+    original_indices = sorted(session.perm[i] for i in guess_indices)
+    with session.lock:
+        if len(set(original_indices)) != session.group_size or guess_mask(original_indices) & session.removed_mask:
+            return jsonify({"error": "Invalid request"}), 400
+
+        result, matched_group = grade_guess(original_indices, session.group_size)
+        if matched_group is not None:
+            session.solve_group(matched_group, original_indices)
+            solve_sessions.resize(session)
+        else:
+            session.add_bad_guess(original_indices)
+        body = session_response(session, 0, limit)
+
+    body["result"] = result
+    if matched_group is not None:
+        body["group"] = matched_group
+    return jsonify(body)
+
+def session_response(session, cursor, limit):
+    suggestions, next_cursor = session.page(cursor, limit)
+    return {
+        "session": session.token,
+        "suggestions": map_suggestions(suggestions, session.inv_perm),
+        "next_cursor": next_cursor,
+        "solved_groups": session.solved_groups
+    }
+
+def parse_solve_request(data, shape=(16, 4)):
+    """Validate a solve payload for a (board size, group size) board and map it to original word indices."""
+    if not isinstance(data, dict):
+        raise ValueError("Invalid request")
+    seed = data.get('seed')
+    if seed is None:
+        raise ValueError("Missing seed")
+    cursor, limit = parse_page(data)
+    mode = data.get('mode', 'greedy')
+    if mode not in SOLVE_MODES:
+        raise ValueError(f"mode must be one of {', '.join(SOLVE_MODES)}")
+
+    size, group_size = shape
+    perm = get_permutation(seed, size)
+    bad_guesses = data.get('bad_guesses', [])
+    if not isinstance(bad_guesses, list):
+        raise ValueError("Invalid word indices")
+    available_indices = to_original(perm, data.get('available_indices', []))
+    bad_guesses = [to_original(perm, guess) for guess in bad_guesses]
+    # Bad guesses as bitmasks over original indices
+    bad_guess_masks = [guess_mask(guess) for guess in bad_guesses]
+    if mode == 'partition' and (len(available_indices) % group_size or len(available_indices) > PARTITION_MAX_WORDS):
+        raise ValueError(f"Partition mode needs a multiple of {group_size} available words, at most {PARTITION_MAX_WORDS}")
+    if cursor > MAX_SEARCH_CURSOR and math.comb(len(available_indices), group_size) > MAX_ENUMERATED_COMBOS:
+        raise ValueError(f"cursor must be at most {MAX_SEARCH_CURSOR} on boards this large")
+
+    return {
+        "perm": perm,
+        "group_size": group_size,
+        "available_indices": available_indices,
+        "bad_guesses": bad_guesses,
+        "bad_guess_masks": bad_guess_masks,
+        "limit": limit,
+        "cursor": cursor,
+        "mode": mode
+    }
+
+def to_original(perm, indices):
+    """Distinct shuffled word indices mapped to sorted original indices.
+
+    Anything else, including out-of-range or negative indices and repeats,
+    raises ValueError; the suggestion cache keys boards by the set of words,
+    so a ranking must never be computed from a list that isn't one.
+    """
+    if not isinstance(indices, list) or not all(type(i) is int and 0 <= i < len(perm) for i in indices) \
+            or len(set(indices)) != len(indices):
+        raise ValueError("Invalid word indices")
+    return sorted(perm[i] for i in indices)
+
+def parse_page(data):
+    """(cursor, limit) from a request payload, validated."""
+    limit = data.get('limit', DEFAULT_SUGGESTION_LIMIT)
+    cursor = data.get('cursor', 0)
+    if not isinstance(limit, int) or not 1 <= limit <= MAX_SUGGESTION_LIMIT:
+        raise ValueError(f"limit must be between 1 and {MAX_SUGGESTION_LIMIT}")
+    if not isinstance(cursor, int) or cursor < 0:
+        raise ValueError("Invalid cursor")
+    return cursor, limit
+
+def solve_board(game_id, board, games=None):
+    """Return (suggestions in shuffled indices, next cursor or None), or None if the game is missing."""
+    cursor, limit, bad_guess_masks = board['cursor'], board['limit'], board['bad_guess_masks']
+    inv_perm = {original: shuffled for shuffled, original in enumerate(board['perm'])}
+    if board['mode'] == 'greedy' and math.comb(len(board['available_indices']), board['group_size']) > MAX_ENUMERATED_COMBOS:
+        return search_board(game_id, board, games, inv_perm)
+
+    available = board['available_indices']
+    if board['mode'] == 'greedy' and len(available) == len(board['perm']):
+        # The opening board, which precompute_opening may have ranked already
+        precomputer.claim(suggestion_cache.key(game_id, available), suggestion_cache.contains(game_id, available))
+    ranked = get_ranked_suggestions(game_id, available, games,
+                                    board['mode'], board['bad_guess_masks'], board['group_size'])
+    if ranked is None:
+        return None
+
+    with timed('rank'):
+        suggestions = ranked.page(cursor, limit, exclude=bad_guess_masks)
+
+    next_cursor = cursor + limit if cursor + limit < ranked.count(bad_guess_masks) else None
+    return map_suggestions(suggestions, inv_perm), next_cursor
+
+def search_board(game_id, board, games, inv_perm):
+    """solve_board for boards too large to rank in full: a bounded search for the requested page.
+
+    The search is not cached, and under SOLVE_SEARCH_BUDGET it returns the
+    best groups found in time.
+    """
+    game = games.get(game_id) if games else None
+    if game is None:
+        with timed('storage'):
+            game = storage.get_game(game_id)
+    if not game:
+        return None
+
+    cursor, limit = board['cursor'], board['limit']
+    with timed('search'):
+        # One extra to learn whether another page follows
+        found, _ = ai_solver.search_top_k(game['adjacency_matrix'], board['available_indices'], cursor + limit + 1,
+                                          board['bad_guesses'], board['group_size'], SOLVE_SEARCH_BUDGET)
+    next_cursor = cursor + limit if len(found) > cursor + limit else None
+    return map_suggestions(found[cursor:cursor + limit], inv_perm), next_cursor
+
+def map_suggestions(suggestions, inv_perm):
+    """Suggestions with their words mapped back to the player's shuffled indices."""
     mapped_suggestions = []
-    for s in suggestions[:5]:
+    for s in suggestions:
         mapped_words = [inv_perm[w] for w in s['words']]
         mapped_suggestions.append({
             "words": mapped_words,
             "score": s['score']
         })
-        
-    return jsonify(mapped_suggestions)
+    return mapped_suggestions
+
+def cache_variant(mode, bad_guess_masks):
+    # Partition rankings leave the bad guesses out of every partition, so they are cached per set of bad guesses
+    if mode == 'partition':
+        return ('partition', tuple(sorted(set(bad_guess_masks or ()))))
+    return None
+
+def get_ranked_suggestions(game_id, available_indices, games=None, mode='greedy', bad_guess_masks=None, group_size=4,
+                           warm=False):
+    """Ranking for a board state, served from the suggestion cache when possible.
+
+    games optionally maps game_id to already fetched games, so batch callers
+    can read everything they need up front. In partition mode groups are
+    ranked by their share of the best whole partitions of the board. warm
+    fills the cache without counting as a request's lookup.
+    """
+    variant = cache_variant(mode, bad_guess_masks)
+
+    def compute():
+        if games is not None and game_id in games:
+            game = games[game_id]
+        else:
+            with timed('storage'):
+                game = storage.get_game(game_id)
+        if not game:
+            return None
+        with timed('score'):
+            if mode == 'partition':
+                return ai_solver.rank_partitions(game['adjacency_matrix'], available_indices, exclude=bad_guess_masks,
+                                                 group_size=group_size)
+            return ai_solver.rank(game['adjacency_matrix'], available_indices, group_size=group_size)
+
+    return suggestion_cache.get_ranked(game_id, available_indices, compute, variant, warm)
+
+def warm_caches(suggestions=True):
+    """Read every game into storage's cache and the board shapes, and rank each opening board.
+
+    Rankings stop once the suggestion cache is full, since warming more would
+    only evict the earlier ones. Returns counts of what was loaded.
+    """
+    storage.prefetch()
+    game_ids = storage.game_ids()
+    games = storage.get_games(game_ids)
+    ranked = 0
+    for shape in set(remember_shape(game) for game in games.values()):
+        ai_solver.prepare(*shape)
+    for game_id in sorted(games):
+        size, group_size = _board_shapes[game_id]
+        if not suggestions or math.comb(size, group_size) > MAX_ENUMERATED_COMBOS:
+            continue
+        stats = suggestion_cache.stats()
+        average = stats['bytes'] / stats['entries'] if stats['entries'] else 0
+        if stats['bytes'] + average > stats['max_bytes']:
+            continue
+        get_ranked_suggestions(game_id, list(range(size)), games, group_size=group_size, warm=True)
+        ranked += 1
+    random_game_pool.refill()
+    return {"games": len(games), "rankings": ranked}
+
+@games_bp.route('/cache/stats', methods=['GET'])
+def get_cache_stats():
+    return jsonify({
+        "suggestions": suggestion_cache.stats(),
+        "games": dict(storage.cache_stats(), backend=storage.name),
+        "random_pool": random_game_pool.stats(),
+        "sessions": solve_sessions.stats(),
+        "precompute": precomputer.stats()
+    })
@@ -1,8 +1,25 @@
+import heapq
 import itertools
+import math
+import time
+from collections import Counter
+
+import numpy as np
+
+# Partitions kept per board state in partition mode, and the largest board it searches
+PARTITION_TOP_K = 32
+PARTITION_MAX_WORDS = 16
+# Boards with more candidate groups than this are searched, not enumerated
+MAX_ENUMERATED_COMBOS = 20000
+# Bounds are summed in a different order than exact scores; allow for the rounding
+BOUND_SLACK = 1e-9
+
 
 class AISolver:
     def __init__(self):
         self.weights = [0.7441864013671875, 0.06005859375]
+        # Combination index tables keyed by (available words, board size)
+        self._tables = {}
 
     def calc_density(self, indices, adjacency_matrix):
         total = 0
@@ -29,7 +46,7 @@ class AISolver:
                     continue
 
                 if j in indices_set:
-                    inside_connections += adjacency_matrix[i][j] / 4
+                    inside_connections += adjacency_matrix[i][j] / len(indices)
                 else:
                     outside_connections += adjacency_matrix[i][j]
         
@@ -38,34 +55,697 @@ class AISolver:
             
         return 1 - outside_connections / ((2 * inside_connections) + outside_connections)
 
-    def generate_suggestions(self, adjacency_matrix, available_indices, bad_guesses=None):
+    def generate_suggestions(self, adjacency_matrix, available_indices, bad_guesses=None, group_size=4):
+        return self.rank(adjacency_matrix, available_indices, bad_guesses, group_size).page(0)
+
+    def top_k(self, adjacency_matrix, available_indices, k, bad_guesses=None, group_size=4, time_budget=None):
+        """The k best groups; boards too large to enumerate go through search_top_k."""
+        if math.comb(len(available_indices), group_size) > MAX_ENUMERATED_COMBOS:
+            return self.search_top_k(adjacency_matrix, available_indices, k, bad_guesses, group_size, time_budget)[0]
+        return self.rank(adjacency_matrix, available_indices, bad_guesses, group_size).top(k)
+
+    def iter_suggestions(self, adjacency_matrix, available_indices, bad_guesses=None, cursor=0, group_size=4):
+        return self.rank(adjacency_matrix, available_indices, bad_guesses, group_size).iter_from(cursor)
+
+    def rank(self, adjacency_matrix, available_indices, bad_guesses=None, group_size=4):
+        """Score every candidate group and return them as lazily ranked RankedSuggestions."""
         if bad_guesses is None:
             bad_guesses = []
-            
-        bad_guesses_set = set(bad_guesses)
-        
-        suggestions = []
-        # Generates all combinations of 4 words from available indices
-        combos = list(itertools.combinations(available_indices, 4))
 
-        for combo in combos:
-            # Skip if this combination has already been guessed and was wrong
-            if tuple(sorted(combo)) in bad_guesses_set:
+        combos, conductance, density = self.score_combinations(adjacency_matrix, available_indices, group_size)
+        scores = self.weights[0] * conductance + self.weights[1] * density
+
+        keep = self._bad_guess_filter(combos, bad_guesses)
+        if keep is not None:
+            combos, scores = combos[keep], scores[keep]
+            conductance, density = conductance[keep], density[keep]
+
+        return RankedSuggestions(combos, scores, conductance, density)
+
+    def rank_partitions(self, adjacency_matrix, available_indices, exclude=None, top_k=PARTITION_TOP_K, group_size=4):
+        """Rank groups by how often they appear in the board's top_k best whole partitions.
+
+        A partition splits every available word into groups of group_size and
+        scores the sum of its groups' scores, so a group that leaves no good
+        way to group the other words ranks low however well it scores alone.
+        Groups in exclude (bitmasks of known wrong guesses) cannot be part of
+        any partition. A suggestion's score is the share of the top
+        partitions containing it; ties go to the one in the better partition.
+        """
+        available = sorted(set(available_indices))
+        if len(available) % group_size or len(available) > PARTITION_MAX_WORDS:
+            raise ValueError(f"Partition mode needs a multiple of {group_size} words, at most {PARTITION_MAX_WORDS}")
+
+        # Every candidate group with its own score, in combination order
+        groups = self.rank(adjacency_matrix, available, group_size=group_size)
+        excluded = set(exclude or ())
+        scores = groups.scores
+        if excluded:
+            scores = np.where(np.isin(groups.masks, list(excluded)), -np.inf, scores)
+        partitions = _top_partitions(groups.masks, scores, guess_mask(available), top_k, group_size) if available else []
+
+        # Dict order keeps each group's first, i.e. best, partition
+        counts = {}
+        for _, members in partitions:
+            for i in members:
+                counts[i] = counts.get(i, 0) + 1
+        chosen = list(counts)
+        shares = [counts[i] / len(partitions) for i in chosen]
+
+        chosen = np.array(chosen, dtype=np.intp)
+        return RankedSuggestions(groups.combos[chosen], np.array(shares, dtype=np.float64),
+                                 groups.conductance[chosen], groups.density[chosen])
+
+    def autosolve(self, adjacency_matrix, max_tries=100, group_size=4):
+        """Play a board the way GeneticAlgorithm.solve_game does and return every guess.
+
+        Each guess is the best-ranked candidate not yet tried. A correct group
+        is masked out of the matrix with -1 and the rest of the board is
+        re-ranked, so a board state is only ever scored once. Groups are the
+        consecutive runs of group_size word indices. Returns a list of
+        {"words", "score", "result", "group"} in original word indices, with
+        result 1 for a group, 0 when one away and -1 otherwise.
+        """
+        return self.autosolve_within(adjacency_matrix, max_tries, group_size)[0]
+
+    def autosolve_within(self, adjacency_matrix, max_tries=100, group_size=4, time_budget=None):
+        """autosolve with an overall time_budget in seconds; returns (trajectory, complete).
+
+        complete is False when the budget ran out before the game was solved
+        or max_tries was reached; the trajectory then holds the guesses made
+        so far. Only boards too large to enumerate can take long enough to
+        matter, since those are searched a page of groups at a time.
+        """
+        deadline = None if time_budget is None else time.perf_counter() + time_budget
+        matrix = np.array(adjacency_matrix, dtype=np.float64)
+        available = list(range(len(matrix)))
+        trajectory = []
+        complete = True
+
+        while available and len(trajectory) < max_tries:
+            if deadline is not None and time.perf_counter() > deadline:
+                complete = False
+                break
+            found = None
+            if math.comb(len(available), group_size) > MAX_ENUMERATED_COMBOS:
+                candidates = search = self._iter_search(matrix, available, group_size, deadline)
+            else:
+                search = None
+                candidates = self.rank(matrix, available, group_size=group_size)
+            for suggestion in candidates:
+                words = sorted(suggestion['words'])
+                group, hits = Counter(w // group_size for w in words).most_common(1)[0]
+                found = group if hits == group_size else None
+                trajectory.append({
+                    "words": words,
+                    "score": suggestion['score'],
+                    "result": 1 if found is not None else (0 if hits == group_size - 1 else -1),
+                    "group": found
+                })
+                if found is not None or len(trajectory) >= max_tries:
+                    break
+
+            if search is not None and search.timed_out:
+                complete = False
+                break
+            if found is None:
+                break
+            for i in words:
+                for j in range(len(matrix)):
+                    matrix[i][j] = -1
+                    matrix[j][i] = -1
+            available = [i for i in available if i not in words]
+
+        return trajectory, complete
+
+    def score_combinations(self, adjacency_matrix, available_indices, group_size=4):
+        """Conductance and density of every group_size-word combination of available_indices.
+
+        Returns (combos, conductance, density) where combos is a (C, group_size)
+        array of word indices in itertools.combinations order. Each sum is laid
+        out as a (terms, C) array and reduced along the leading axis, which
+        numpy adds strictly in order, so the values are bit-for-bit identical
+        to calc_conductance/calc_density.
+        """
+        matrix = np.asarray(adjacency_matrix, dtype=np.float64)
+        available = np.asarray(available_indices, dtype=np.intp)
+        tables = self._combo_tables(len(available), matrix.shape[0], group_size)
+        combos = available[tables[0].T]
+        conductance, density = _score_tables(matrix, available, tables)
+        return combos, conductance, density
+
+    def prepare(self, size, group_size=4):
+        """Build the index tables and partition plans any board state of a size-word game uses.
+
+        They are otherwise built by the first request that needs them; calling
+        this before workers fork lets every worker share one copy.
+        """
+        for k in range(group_size, size + 1):
+            if math.comb(k, group_size) <= MAX_ENUMERATED_COMBOS:
+                self._combo_tables(k, size, group_size)
+        for k in range(group_size, min(size, PARTITION_MAX_WORDS) + 1, group_size):
+            _partition_plan(k, group_size)
+
+    def search_top_k(self, adjacency_matrix, available_indices, k, bad_guesses=None, group_size=4, time_budget=None):
+        """The k best groups by best-first branch and bound, without enumerating every combination.
+
+        Groups are grown one word at a time in available_indices order. Each
+        partial group gets an upper bound on the score of any completion, from
+        the row sums of the words it could still take, and is only expanded
+        while that bound can beat the k-th best group found so far. Complete
+        groups are scored exactly as rank() scores them, so with no time
+        budget the result equals rank().top(k). Returns (suggestions,
+        complete); complete is False when time_budget seconds ran out first,
+        and the suggestions are then the best found by then.
+        """
+        deadline = None if time_budget is None else time.perf_counter() + time_budget
+        matrix = np.asarray(adjacency_matrix, dtype=np.float64)
+        available = np.asarray(available_indices, dtype=np.intp)
+        size, n = len(available), matrix.shape[0]
+        if k <= 0 or size < group_size:
+            return [], True
+        bounds = _GroupBounds(matrix, available, group_size, self.weights)
+        bad_masks = {guess_mask(guess) for guess in bad_guesses or ()}
+
+        # Frontier entries: (-bound, members, inside sum, row sum total, links to every position)
+        frontier = [(-np.inf, (), 0.0, 0.0, np.zeros(size))]
+        found = []
+        threshold = -np.inf
+        complete = True
+        while frontier:
+            negative_bound, members, inside, total, links = heapq.heappop(frontier)
+            if -negative_bound < threshold - BOUND_SLACK:
+                break
+            if deadline is not None and time.perf_counter() > deadline:
+                complete = False
+                break
+
+            first = members[-1] + 1 if members else 0
+            remaining = group_size - len(members)
+            candidates = np.arange(first, size - remaining + 1)
+            if remaining == 1:
+                # Every completion of this group, scored exactly
+                positions = np.vstack([np.repeat([members], len(candidates), axis=0).T, candidates]) \
+                    if members else candidates[None, :]
+                groups = available[positions.T]
+                tables = _position_tables(positions, size, n)
+                conductance, density = _score_tables(matrix, available, tables)
+                scores = self.weights[0] * conductance + self.weights[1] * density
+                for i in range(len(candidates)):
+                    if bad_masks and guess_mask(groups[i].tolist()) in bad_masks:
+                        continue
+                    found.append((float(scores[i]), positions[:, i].tolist(), float(conductance[i]), float(density[i])))
+                found.sort(key=lambda entry: (-entry[0], entry[1]))
+                del found[k:]
+                if len(found) == k:
+                    threshold = found[-1][0]
                 continue
-                
-            conductance = self.calc_conductance(combo, adjacency_matrix)
-            density = self.calc_density(combo, adjacency_matrix)
-            score = self.weights[0] * conductance + self.weights[1] * density
-            
-            suggestions.append({
-                "words": list(combo),
+
+            child_bounds = bounds.children(members, inside, total, links, candidates)
+            for j, bound in zip(candidates.tolist(), child_bounds.tolist()):
+                if bound < threshold - BOUND_SLACK:
+                    continue
+                row = bounds.pairs[j]
+                heapq.heappush(frontier, (-bound, members + (j,), inside + links[j] + bounds.diagonal[j],
+                                          total + bounds.row_sums[j], links + row))
+
+        suggestions = [
+            {
+                "words": available[positions].tolist(),
                 "score": score,
                 "conductance": conductance,
                 "density": density
-            })
+            }
+            for score, positions, conductance, density in found
+        ]
+        return suggestions, complete
+
+    def _iter_search(self, adjacency_matrix, available_indices, group_size, deadline=None):
+        return _SearchIterator(self, adjacency_matrix, available_indices, group_size, deadline)
+
+    def _combo_tables(self, k, n, group_size=4):
+        # Index arrays that only depend on how many words are left (k), the
+        # board size (n) and the group size, built once and reused for every matrix
+        tables = self._tables.get((k, n, group_size))
+        if tables is None:
+            positions = np.array(list(itertools.combinations(range(k), group_size)),
+                                 dtype=np.intp).reshape(-1, group_size).T.copy()
+            tables = _position_tables(positions, k, n)
+            self._tables[(k, n, group_size)] = tables
+        return tables
+
+    def _bad_guess_filter(self, combos, bad_guesses):
+        # Each combo and bad guess becomes a bitmask of word indices, so the
+        # filter is a single isin over integers instead of per-combo tuple lookups
+        if not bad_guesses or len(combos) == 0:
+            return None
+        bad_masks = np.array([guess_mask(guess) for guess in bad_guesses], dtype=np.int64)
+        return ~np.isin(_combo_masks(combos), bad_masks)
+
+
+class _SearchIterator:
+    """Ranked groups of a board too large to enumerate, searched a page at a time.
+
+    search_top_k(k) returns exactly the first k of the full ranking, so once
+    a page is used up the next search asks for twice as many and only the
+    new tail is handed out; a game of g guesses costs O(log g) searches.
+    With a deadline, iteration stops early and timed_out is set.
+    """
+
+    def __init__(self, solver, matrix, available, group_size, deadline=None, page=8):
+        self.solver = solver
+        self.matrix = matrix
+        self.available = available
+        self.group_size = group_size
+        self.deadline = deadline
+        self.page = page
+        self.timed_out = False
+
+    def __iter__(self):
+        given = 0
+        k = self.page
+        while True:
+            budget = None if self.deadline is None else self.deadline - time.perf_counter()
+            if budget is not None and budget <= 0:
+                self.timed_out = True
+                return
+            found, complete = self.solver.search_top_k(self.matrix, self.available, k, None, self.group_size, budget)
+            if not complete:
+                self.timed_out = True
+                return
+            yield from found[given:]
+            if len(found) < k:
+                return
+            given = len(found)
+            k *= 2
+
+
+class RankedSuggestions:
+    """Scored candidates for one board state, ranked on demand.
+
+    Only the prefix that has been asked for is ever ordered, so reading the top
+    five costs a partial selection rather than a full sort. Ties keep their
+    combination order, matching a stable sort by descending score.
+    """
+
+    def __init__(self, combos, scores, conductance, density):
+        self.combos = combos
+        self.scores = scores
+        self.conductance = conductance
+        self.density = density
+        self._order = []
+        self._masks = None
+
+    def __len__(self):
+        return len(self.scores)
+
+    def __iter__(self):
+        return self.iter_from(0)
+
+    @property
+    def masks(self):
+        # Bitmask of word indices per candidate, built on first use
+        if self._masks is None:
+            self._masks = _combo_masks(self.combos)
+        return self._masks
+
+    @property
+    def nbytes(self):
+        arrays = (self.combos, self.scores, self.conductance, self.density)
+        # Room for the masks and a fully ranked order array
+        return sum(a.nbytes for a in arrays) + 16 * len(self)
+
+    def count(self, exclude=None):
+        """Number of candidates left once the bitmasks in exclude are skipped."""
+        if not exclude:
+            return len(self)
+        return len(self) - int(np.isin(self.masks, list(exclude)).sum())
+
+    def top(self, k, exclude=None):
+        return self.page(0, k, exclude)
+
+    def page(self, cursor=0, limit=None, exclude=None):
+        stop = None if limit is None else cursor + limit
+        if exclude:
+            return self._suggestions(list(itertools.islice(self._ranked_indices(exclude), cursor, stop)))
+
+        end = len(self) if stop is None else min(len(self), stop)
+        if cursor >= end:
+            return []
+        self._rank_prefix(end)
+        return self._suggestions(self._order[cursor:end])
+
+    def without(self, removed_mask):
+        """Candidates sharing no word with removed_mask, with their scores and ranking carried over.
+
+        A candidate's score only reads its own words' rows of the matrix, so
+        removing solved words never changes the scores that remain: they are
+        filtered, not rescored, and the prefix ranked so far stays ranked.
+        """
+        masks = self.masks
+        keep = (masks & removed_mask) == 0
+        subset = RankedSuggestions(self.combos[keep], self.scores[keep], self.conductance[keep], self.density[keep])
+        if len(self._order):
+            order = np.asarray(self._order)
+            subset._order = (np.cumsum(keep) - 1)[order[keep[order]]]
+        subset._masks = masks[keep]
+        return subset
+
+    def iter_from(self, cursor=0, exclude=None):
+        for i in itertools.islice(self._ranked_indices(exclude), cursor, None):
+            yield self._suggestions([i])[0]
+
+    def _ranked_indices(self, exclude=None):
+        # Resumable: each step ranks a larger prefix only when the caller has
+        # consumed everything ordered so far; excluded candidates are skipped
+        # here, at read time, so one ranking serves every set of bad guesses
+        excluded = set(exclude or ())
+        masks = self.masks if excluded else None
+        position = 0
+        while position < len(self):
+            self._rank_prefix(max(position + 8, 2 * len(self._order)))
+            order = self._order
+            while position < len(order):
+                i = int(order[position])
+                position += 1
+                if masks is None or int(masks[i]) not in excluded:
+                    yield i
+
+    def _rank_prefix(self, k):
+        k = min(k, len(self))
+        if k <= len(self._order):
+            return
+
+        if k == len(self):
+            self._order = np.argsort(-self.scores, kind='stable')
+        else:
+            self._order = _top_indices(self.scores, k)
+
+    def _suggestions(self, order):
+        return [
+            {
+                "words": words,
+                "score": score,
+                "conductance": cond,
+                "density": dens
+            }
+            for words, score, cond, dens in zip(
+                self.combos[order].tolist(),
+                self.scores[order].tolist(),
+                self.conductance[order].tolist(),
+                self.density[order].tolist()
+            )
+        ]
+
+
+class _GroupBounds:
+    """Upper bounds on the score of any completion of a partial group, for search_top_k.
+
+    With S the sum of the valid cells inside a group and T the sum of its
+    members' valid row sums, conductance is 1 - (T - S) / (T - S + 2S/g),
+    a linear-fractional function of (S, T). Over a box of (S, T) values on
+    which its denominator keeps one sign, it is extreme at the box's
+    corners. S and T of any completion are boxed with sorted per-word
+    bounds: a word's row sum for T, and for S its links to the partial
+    group plus its strongest (or weakest) links to any other words.
+    Density is at most S/g^2, as cells marked -1 only lower it.
+    """
+
+    def __init__(self, matrix, available, group_size, weights):
+        rows = matrix[available]
+        valid = np.where(rows != -1, rows, 0.0)
+        block = valid[:, available]
+        size = len(available)
+        self.group_size = group_size
+        self.weights = weights
+        self.row_sums = valid.sum(axis=1)
+        self.diagonal = block.diagonal().copy()
+        # pairs[i, j]: what i and j add to the inside sum when both are in the group
+        self.pairs = block + block.T
+        np.fill_diagonal(self.pairs, 0.0)
+        self.invalid_cells = bool((matrix[np.ix_(available, available)] == -1).any())
+
+        # Sum of each word's t strongest and t weakest links, for t < group_size
+        others = self.pairs[~np.eye(size, dtype=bool)].reshape(size, size - 1) if size > 1 else np.zeros((size, 0))
+        ordered = np.sort(others, axis=1)
+        steps = min(group_size - 1, size - 1)
+        self.strongest = np.hstack([np.zeros((size, 1)), np.cumsum(ordered[:, ::-1][:, :steps], axis=1)])
+        self.weakest = np.hstack([np.zeros((size, 1)), np.cumsum(ordered[:, :steps], axis=1)])
+
+    def children(self, members, inside, total, links, candidates):
+        """Bound for each partial group members + (j,), j in candidates, that still needs more words."""
+        g = self.group_size
+        remaining = g - len(members) - 1
+        # later[c, x]: word x could still join after candidate c
+        later = np.arange(len(self.row_sums))[None, :] > candidates[:, None]
+
+        # Each later word's links to the group so far, plus half its strongest
+        # (weakest) links to whichever other words complete the group
+        joins = links + self.diagonal + self.pairs[candidates]
+        upper = np.where(later, joins + 0.5 * self.strongest[:, remaining - 1], -np.inf)
+        lower = np.where(later, joins + 0.5 * self.weakest[:, remaining - 1], np.inf)
+        start = inside + links[candidates] + self.diagonal[candidates]
+        inside_high = start + _largest_sum(upper, remaining)
+        inside_low = start - _largest_sum(-lower, remaining)
+
+        row_sums = np.broadcast_to(self.row_sums, later.shape)
+        start = total + self.row_sums[candidates]
+        total_high = start + _largest_sum(np.where(later, row_sums, -np.inf), remaining)
+        total_low = start - _largest_sum(np.where(later, -row_sums, -np.inf), remaining)
+
+        conductance_high, conductance_low = self._conductance_range(inside_low, inside_high, total_low, total_high)
+        density_high = inside_high / (g * g)
+        density_low = (inside_low - (g * g if self.invalid_cells else 0)) / (g * g)
+        w0, w1 = self.weights
+        return (w0 * (conductance_high if w0 >= 0 else conductance_low)
+                + w1 * (density_high if w1 >= 0 else density_low))
+
+    def _conductance_range(self, inside_low, inside_high, total_low, total_high):
+        g = self.group_size
+        corners = []
+        denominators = []
+        for s in (inside_low, inside_high):
+            for t in (total_low, total_high):
+                denominator = t - s + 2 * s / g
+                denominators.append(denominator)
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    corners.append(1 - (t - s) / denominator)
+        denominators = np.array(denominators)
+        corners = np.array(corners)
+        one_sign = (denominators > 0).all(axis=0) | (denominators < 0).all(axis=0)
+        # A group with nothing inside or nothing outside scores -1
+        high = np.where(one_sign, np.maximum(corners.max(axis=0), -1), np.inf)
+        low = np.where(one_sign, np.minimum(corners.min(axis=0), -1), -np.inf)
+        return high, low
+
+
+def _largest_sum(values, r):
+    # Sum of the r largest entries of each row
+    return -np.partition(-values, r - 1, axis=1)[:, :r].sum(axis=1)
+
+
+def guess_mask(indices):
+    """Bitmask with one bit set per word index, used to compare groups as sets."""
+    mask = 0
+    for i in indices:
+        mask |= 1 << i
+    return mask
+
+
+def _position_tables(positions, k, n):
+    # Gather indices for scoring the groups in positions, a (group_size, C)
+    # array of positions among k available words on an n-word board
+    group_size, count = positions.shape
+    row_index = (positions[:, None, :] * n + np.arange(n)[None, :, None]).reshape(group_size * n, count)
+    block_index = (positions[:, None, :] * k + positions[None, :, :]).reshape(group_size * group_size, count)
+    members = np.zeros((k, count), dtype=bool)
+    members[positions, np.arange(count)] = True
+    return positions, row_index, block_index, members
+
+
+def _score_tables(matrix, available, tables):
+    """(conductance, density) of the groups described by _position_tables output."""
+    positions, row_index, block_index, members = tables
+    group_size, count = positions.shape
+    n = matrix.shape[0]
+    if count == 0:
+        empty = np.zeros(0, dtype=np.float64)
+        return empty, empty
+    if count == 1:
+        # A single column is reduced pairwise rather than in order; score it twice to keep the order
+        conductance, density = _score_tables(matrix, available, _position_tables(
+            np.repeat(positions, 2, axis=1), len(available), n))
+        return conductance[:1], density[:1]
+
+    rows = matrix[available]
+
+    # Density walks the block of each combo in combo order
+    density = np.add.reduce(rows[:, available].ravel().take(block_index), axis=0) / (group_size * group_size)
+
+    # Conductance walks each member's full row in ascending column order,
+    # skipping -1 cells; a skipped cell contributes an exact 0.0
+    valid = rows != -1
+    in_combo = np.zeros((n, count), dtype=bool)
+    in_combo[available] = members
+    inside_terms = np.where(valid, rows / group_size, 0.0).ravel().take(row_index).reshape(group_size, n, count)
+    outside_terms = np.where(valid, rows, 0.0).ravel().take(row_index).reshape(group_size, n, count)
+    inside = np.add.reduce(np.where(in_combo, inside_terms, 0.0).reshape(group_size * n, count), axis=0)
+    outside = np.add.reduce(np.where(in_combo, 0.0, outside_terms).reshape(group_size * n, count), axis=0)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        conductance = 1 - outside / ((2 * inside) + outside)
+    conductance[(outside == 0) | (inside == 0)] = -1
+
+    return conductance, density
+
+
+def _combo_masks(combos):
+    return np.bitwise_or.reduce(np.left_shift(1, combos.astype(np.int64)), axis=1)
+
+
+def _top_partitions(masks, scores, board_mask, k, group_size=4):
+    """The k best partitions of board_mask into candidate groups, best first.
+
+    masks and scores describe every group_size-subset of the board. Returns
+    a list of (total score, indices into masks), partitions with an
+    excluded (-inf) group left out. This is subset DP over bitmasks: a set
+    of words is split by choosing the group holding its lowest word, so
+    each partition is reached exactly once, and every set reachable that
+    way keeps its own k best completions. A 16-word board visits about
+    7,000 sets instead of its 2.6M partitions.
+    """
+    words = np.array([i for i in range(board_mask.bit_length()) if board_mask >> i & 1], dtype=np.int64)
+    positions, options, last_groups = _partition_plan(len(words), group_size)
+
+    # Plan groups are numbered in combination order of board positions; map them onto masks
+    order = np.argsort(masks, kind='stable')
+    sorted_masks = masks[order]
+    group_masks = np.bitwise_or.reduce(np.left_shift(np.int64(1), words[positions]), axis=1)
+    plan_to_index = order[np.searchsorted(sorted_masks, group_masks)]
+    plan_scores = scores[plan_to_index]
+
+    # Bottom-up: k best completions per set, with back pointers (option * kp + rank below)
+    best = plan_scores[last_groups][:, None]
+    backs = []
+    for group_index, rest_rows in reversed(options):
+        n, o = group_index.shape
+        kp = best.shape[1]
+        group_scores = plan_scores[group_index]
+        kept = _best_options(group_scores + best[rest_rows, 0], k)
+        if kept is not None:
+            group_index = np.take_along_axis(group_index, kept, axis=1)
+            rest_rows = np.take_along_axis(rest_rows, kept, axis=1)
+            group_scores = np.take_along_axis(group_scores, kept, axis=1)
+            o = kept.shape[1]
+        candidates = (group_scores[:, :, None] + best[rest_rows]).reshape(n, o * kp)
+        top = _top_columns(candidates, k)
+        best = np.take_along_axis(candidates, top, axis=1)
+        backs.append((group_index, rest_rows, top, kp))
+
+    partitions = []
+    for rank in range(best.shape[1]):
+        total = float(best[0, rank])
+        if total == -np.inf:
+            break
+        row, r = 0, rank
+        members = []
+        for group_index, rest_rows, top, kp in reversed(backs):
+            option, r = divmod(int(top[row, r]), kp)
+            members.append(int(plan_to_index[group_index[row, option]]))
+            row = int(rest_rows[row, option])
+        members.append(int(plan_to_index[last_groups[row]]))
+        partitions.append((total, members))
+    return partitions
+
+
+def _top_columns(values, k):
+    # _top_indices for every row at once: the k best columns per row, best
+    # first, ties going to the lower column as heapq.nlargest would
+    n, width = values.shape
+    if width <= k:
+        return np.argsort(-values, axis=1, kind='stable')
+    threshold = -np.partition(-values, k - 1, axis=1)[:, k - 1:k]
+    above = values > threshold
+    ties = values == threshold
+    selected = above | (ties & (np.cumsum(ties, axis=1) <= k - above.sum(axis=1, keepdims=True)))
+    top = np.nonzero(selected)[1].reshape(n, k)
+    return np.take_along_axis(top, np.argsort(-np.take_along_axis(values, top, axis=1), axis=1, kind='stable'), axis=1)
+
+
+def _best_options(heads, k):
+    # Each option's completions are sorted, so its head is its best total. With
+    # T the k-th best head per set, the k heads at or above T already beat
+    # every completion of an option below T, so only options at or above T
+    # can place. The ones kept stay in option order, so flat-index tie breaks
+    # are unchanged. Returns their columns, or None when nothing can be cut.
+    n, o = heads.shape
+    if o <= k:
+        return None
+    threshold = -np.partition(-heads, k - 1, axis=1)[:, k - 1:k]
+    keep = heads >= threshold
+    width = int(keep.sum(axis=1).max())
+    if width >= o:
+        return None
+    # Stable sort puts the kept options first, in option order; rows with
+    # fewer than width are padded with options below their threshold
+    return np.sort(np.argsort(~keep, axis=1, kind='stable')[:, :width], axis=1)
+
+
+_partition_plans = {}
+
+
+def _partition_plan(size, group_size):
+    """Sets reachable from a board of size words, built once per board size.
+
+    Works in board positions 0..size-1, so it serves every board and every
+    set of remaining words of that size. Returns (positions, options,
+    last_groups): positions holds each group's positions in combination
+    order, the numbering used everywhere else; options has one
+    (group_index, rest_rows) pair per level, the groups holding each set's
+    lowest word and the row of the set left after removing them; last_groups
+    is the single group of each set at the final level.
+    """
+    plan = _partition_plans.get((size, group_size))
+    if plan is not None:
+        return plan
+
+    positions = np.array(list(itertools.combinations(range(size), group_size)), dtype=np.int64).reshape(-1, group_size)
+    group_masks = np.bitwise_or.reduce(np.left_shift(np.int64(1), positions), axis=1)
+    group_order = np.argsort(group_masks)
+    sorted_group_masks = group_masks[group_order]
+
+    # Top-down: the sets reachable from the board, one level per group removed
+    levels = [np.array([(1 << size) - 1], dtype=np.int64)]
+    options = []
+    bits = np.arange(size, dtype=np.int64)
+    remaining = size
+    while remaining > group_size:
+        current = levels[-1]
+        present = ((current[:, None] >> bits[None, :]) & 1).astype(bool)
+        members = np.broadcast_to(bits, present.shape)[present].reshape(len(current), remaining)
+        pattern = np.array(list(itertools.combinations(range(1, remaining), group_size - 1)), dtype=np.intp)
+        groups = np.left_shift(np.int64(1), members[:, :1]) | np.bitwise_or.reduce(
+            np.left_shift(np.int64(1), members[:, pattern]), axis=2)
+        rest = current[:, None] ^ groups
+        next_level = np.unique(rest)
+        options.append((group_order[np.searchsorted(sorted_group_masks, groups)], np.searchsorted(next_level, rest)))
+        levels.append(next_level)
+        remaining -= group_size
+    last_groups = group_order[np.searchsorted(sorted_group_masks, levels[-1])]
+
+    plan = (positions, options, last_groups)
+    _partition_plans[(size, group_size)] = plan
+    return plan
+
 
-        # Sort by score descending
-        suggestions.sort(key=lambda x: x['score'], reverse=True)
-        return suggestions
+def _top_indices(scores, k):
+    # argpartition finds the k-th best score in O(C); everything strictly above
+    # it is in, and ties at the cut are taken lowest index first so the result
+    # equals the first k entries of a stable descending sort
+    threshold = scores[np.argpartition(-scores, k - 1)[k - 1]]
+    above = np.flatnonzero(scores > threshold)
+    ties = np.flatnonzero(scores == threshold)[:k - len(above)]
+    selected = np.concatenate((above, ties))
+    return selected[np.lexsort((selected, -scores[selected]))]
 
 ai_solver = AISolver()
@@ -1,43 +1,233 @@
-import boto3
-import random
-from decimal import Decimal
+import threading
+import time
+from collections import OrderedDict
 import os
+import numpy as np
+from app.services.game_item import decode_item
+from app.services.game_storage import GameStorage
+from app.services.metrics import game_cache_requests, storage_errors, timed
+
+BATCH_GET_LIMIT = 100
+# Retries of a batch's UnprocessedKeys before those games are given up on
+BATCH_GET_RETRIES = 5
+TABLE_NAME = 'ConnectionsGames'
+FALLBACK_GAME_IDS = (
+    1, 2, 4, 12, 19, 22, 26, 27, 31, 32, 35, 39, 40, 43, 48, 49, 53, 54, 55, 58, 61, 62, 64, 65, 68, 69, 71, 72, 74, 78, 82, 84, 86, 89, 90, 94, 95, 99, 100, 104, 105, 108, 114, 118, 120, 127, 128, 131, 132, 133, 135, 136, 140, 142, 145, 147, 148, 149, 152, 157, 161, 163, 165, 172, 176, 180, 182, 187, 190, 193, 195, 196, 199, 202, 205, 206, 209, 212, 214, 216, 218, 221, 223, 224, 225, 227, 229, 230, 233, 236, 237, 239, 242, 243, 245, 250, 251, 257, 261, 263, 264, 265, 267, 268, 269, 270, 274, 275, 279, 281, 286, 295, 296, 298, 299, 305, 308, 309, 312, 317, 318, 323, 324, 325, 326, 329, 335, 336, 339, 340, 342, 343, 346, 351, 352, 357, 361, 363, 364, 365, 367, 368, 369, 371, 372, 374, 377, 379, 381, 382, 383, 384, 386, 389, 391, 392, 393, 394, 400, 403, 407, 408, 409, 410, 413, 414, 417, 418, 420, 421, 423, 424, 430, 431, 435, 444, 446, 447, 453, 454, 456, 457, 459, 460, 461, 469, 471, 476, 478, 479, 480, 481, 485, 486, 487, 489, 490, 493, 496, 497, 498, 501, 503, 504, 505, 510, 511, 512, 513, 515, 516, 518, 522, 524, 525, 527, 529, 531, 532, 534, 535, 541, 542, 543, 545, 551, 555, 556, 557, 564, 565, 566, 567, 568, 569, 572, 575, 578, 583, 586, 590, 593, 595, 596, 600, 601, 602, 603, 605, 610, 612, 613, 614, 615, 618, 620, 621, 623, 626, 632, 634, 635, 638, 639
+)
+
+
+class DynamoService(GameStorage):
+    name = 'dynamodb'
 
-class DynamoService:
     def __init__(self):
-        self.dynamodb = boto3.resource('dynamodb', region_name=os.getenv('AWS_REGION', 'us-east-1'))
-        self.table = self.dynamodb.Table('ConnectionsGames')
+        self.max_connections = int(os.getenv('DYNAMO_MAX_CONNECTIONS', 50))
+        self.region = os.getenv('AWS_REGION', 'us-east-1')
+        self._resource = None
+        self._connect_lock = threading.Lock()
+        self.cache_ttl = float(os.getenv('GAME_CACHE_TTL', 3600))
+        self.cache_max_games = int(os.getenv('GAME_CACHE_MAX_GAMES', 1024))
+        # game_number -> (words, float32 buffer, group size, expires_at), least recently used first
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self.index_refresh = float(os.getenv('GAME_INDEX_REFRESH', 300))
+        self._game_ids = None
+        self._refresh_thread = None
+        # A forked worker keeps the decoded games (shared copy-on-write) but
+        # must not reuse the parent's sockets, locks or thread handles
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    @property
+    def dynamodb(self):
+        """boto3 resource with one connection pool shared by every request and background thread, created on first use."""
+        if self._resource is None:
+            with self._connect_lock:
+                if self._resource is None:
+                    # boto3 takes a noticeable share of cold start to import, so it waits until a game is read
+                    import boto3
+                    from botocore.config import Config
+
+                    session = boto3.session.Session()
+                    config = Config(max_pool_connections=self.max_connections)
+                    self._resource = session.resource('dynamodb', region_name=self.region, config=config)
+        return self._resource
+
+    @property
+    def table(self):
+        return self.dynamodb.Table(TABLE_NAME)
+
+    @property
+    def client(self):
+        # Raw client calls skip boto3's Decimal deserializer entirely
+        return self.dynamodb.meta.client
 
     def get_game(self, game_id):
+        game_id = int(game_id)
+        cached = self._cache_get(game_id)
+        if cached is not None:
+            return _game_dict(game_id, *cached)
+
         try:
-            response = self.table.get_item(Key={'game_number': int(game_id)})
+            response = self.client.get_item(TableName=TABLE_NAME, Key={'game_number': {'N': str(game_id)}})
             item = response.get('Item')
             if item:
-                return self._decimal_to_float(item)
+                words, matrix, group_size = self._decode_item(item)
+                self._cache_put(game_id, words, matrix, group_size)
+                return _game_dict(game_id, words, matrix, group_size)
             return None
         except Exception as e:
+            storage_errors.inc(backend=self.name, operation='get_item')
             print(f"Error fetching game {game_id}: {e}")
             return None
 
-    def get_random_game(self):
+    def game_ids(self):
+        """Playable game ids from the -1 metadata item, loaded once and refreshed in the background."""
+        if self._game_ids is None:
+            self.refresh_game_ids()
+        return self._game_ids
+
+    def refresh_game_ids(self):
+        game_ids = self._available_game_ids()
+        if game_ids:
+            self._game_ids = tuple(sorted(game_ids))
+        elif self._game_ids is None:
+            # Tables loaded before the metadata item existed
+            self._game_ids = FALLBACK_GAME_IDS
+        return self._game_ids
+
+    def start_index_refresh(self):
+        """Re-read the game index every GAME_INDEX_REFRESH seconds on a daemon thread (0 disables it)."""
+        with self._cache_lock:
+            if self._refresh_thread is not None or self.index_refresh <= 0:
+                return
+            self._refresh_thread = threading.Thread(target=self._refresh_loop, name='game-index-refresh', daemon=True)
+            self._refresh_thread.start()
+
+    def get_games(self, game_ids):
+        """Fetch several games at once: cached ones locally, the rest in batch_get_item calls."""
+        games = {}
+        missing = []
+        for game_id in set(int(game_id) for game_id in game_ids):
+            cached = self._cache_get(game_id)
+            if cached is not None:
+                games[game_id] = _game_dict(game_id, *cached)
+            else:
+                missing.append(game_id)
+
+        for game_id, decoded in self._batch_fetch(missing).items():
+            games[game_id] = _game_dict(game_id, *decoded)
+        return games
+
+    def prefetch(self, game_ids=None):
+        """Load games into the cache with batch_get_item; defaults to every game in the metadata item."""
+        if game_ids is None:
+            game_ids = self._available_game_ids()
+        return len(self._batch_fetch(game_ids))
+
+    def _batch_fetch(self, game_ids):
+        # Decoded games by id, also stored in the cache; UnprocessedKeys are retried with backoff,
+        # and games still unprocessed after BATCH_GET_RETRIES are left out
+        pending = [{'game_number': {'N': str(int(game_id))}} for game_id in game_ids]
+        fetched = {}
+        for start in range(0, len(pending), BATCH_GET_LIMIT):
+            keys = pending[start:start + BATCH_GET_LIMIT]
+            attempt = 0
+            while keys:
+                try:
+                    response = self.client.batch_get_item(RequestItems={TABLE_NAME: {'Keys': keys}})
+                except Exception as e:
+                    storage_errors.inc(backend=self.name, operation='batch_get_item')
+                    print(f"Error batch fetching games: {e}")
+                    return fetched
+
+                for item in response.get('Responses', {}).get(TABLE_NAME, []):
+                    game_id = int(item['game_number']['N'])
+                    try:
+                        words, matrix, group_size = self._decode_item(item)
+                    except Exception as e:
+                        # One bad item (or the -1 metadata item) leaves the rest of the batch usable
+                        storage_errors.inc(backend=self.name, operation='decode')
+                        print(f"Error decoding game {game_id}: {e}")
+                        continue
+                    self._cache_put(game_id, words, matrix, group_size)
+                    fetched[game_id] = (words, matrix, group_size)
+
+                keys = response.get('UnprocessedKeys', {}).get(TABLE_NAME, {}).get('Keys', [])
+                if keys:
+                    attempt += 1
+                    if attempt > BATCH_GET_RETRIES:
+                        storage_errors.inc(len(keys), backend=self.name, operation='batch_get_item_unprocessed')
+                        print(f"Giving up on {len(keys)} games still unprocessed after {BATCH_GET_RETRIES} retries")
+                        break
+                    time.sleep(min(0.05 * 2 ** attempt, 2.0))
+        return fetched
+
+    def cache_stats(self):
+        with self._cache_lock:
+            return {"games": len(self._cache), "max_games": self.cache_max_games, "ttl": self.cache_ttl}
+
+    def _available_game_ids(self):
+        # Uses the low-level client, which unlike the table resource is safe to call from the refresh thread
         try:
-            available_games = [
-                1, 2, 4, 12, 19, 22, 26, 27, 31, 32, 35, 39, 40, 43, 48, 49, 53, 54, 55, 58, 61, 62, 64, 65, 68, 69, 71, 72, 74, 78, 82, 84, 86, 89, 90, 94, 95, 99, 100, 104, 105, 108, 114, 118, 120, 127, 128, 131, 132, 133, 135, 136, 140, 142, 145, 147, 148, 149, 152, 157, 161, 163, 165, 172, 176, 180, 182, 187, 190, 193, 195, 196, 199, 202, 205, 206, 209, 212, 214, 216, 218, 221, 223, 224, 225, 227, 229, 230, 233, 236, 237, 239, 242, 243, 245, 250, 251, 257, 261, 263, 264, 265, 267, 268, 269, 270, 274, 275, 279, 281, 286, 295, 296, 298, 299, 305, 308, 309, 312, 317, 318, 323, 324, 325, 326, 329, 335, 336, 339, 340, 342, 343, 346, 351, 352, 357, 361, 363, 364, 365, 367, 368, 369, 371, 372, 374, 377, 379, 381, 382, 383, 384, 386, 389, 391, 392, 393, 394, 400, 403, 407, 408, 409, 410, 413, 414, 417, 418, 420, 421, 423, 424, 430, 431, 435, 444, 446, 447, 453, 454, 456, 457, 459, 460, 461, 469, 471, 476, 478, 479, 480, 481, 485, 486, 487, 489, 490, 493, 496, 497, 498, 501, 503, 504, 505, 510, 511, 512, 513, 515, 516, 518, 522, 524, 525, 527, 529, 531, 532, 534, 535, 541, 542, 543, 545, 551, 555, 556, 557, 564, 565, 566, 567, 568, 569, 572, 575, 578, 583, 586, 590, 593, 595, 596, 600, 601, 602, 603, 605, 610, 612, 613, 614, 615, 618, 620, 621, 623, 626, 632, 634, 635, 638, 639
-            ]
-            random_id = random.choice(available_games)
-            return self.get_game(random_id)
+            item = self.client.get_item(TableName=TABLE_NAME, Key={'game_number': {'N': '-1'}}).get('Item')
         except Exception as e:
-            print(f"Error fetching random game: {e}")
-            return None
+            storage_errors.inc(backend=self.name, operation='get_index')
+            print(f"Error fetching game index: {e}")
+            return []
+        if not item:
+            return []
+        return [int(game_id['N']) for game_id in item.get('available_games', {}).get('L', [])]
+
+    def _after_fork(self):
+        self._resource = None
+        self._connect_lock = threading.Lock()
+        self._cache_lock = threading.Lock()
+        self._refresh_thread = None
+
+    def _refresh_loop(self):
+        while True:
+            self.refresh_game_ids()
+            time.sleep(self.index_refresh)
+
+    def _cache_get(self, game_id):
+        with self._cache_lock:
+            entry = self._cache.get(game_id)
+            if entry is None:
+                game_cache_requests.inc(result='miss')
+                return None
+            if entry[3] < time.monotonic():
+                del self._cache[game_id]
+                game_cache_requests.inc(result='expired')
+                return None
+            self._cache.move_to_end(game_id)
+            game_cache_requests.inc(result='hit')
+            return entry[:3]
+
+    def _cache_put(self, game_id, words, matrix, group_size=4):
+        with self._cache_lock:
+            self._cache[game_id] = (words, matrix, group_size, time.monotonic() + self.cache_ttl)
+            self._cache.move_to_end(game_id)
+            while len(self._cache) > self.cache_max_games:
+                self._cache.popitem(last=False)
+
+    def _decode_item(self, item):
+        # Binary (format_version 2) and legacy Number-list items both decode
+        # straight into a float32 buffer
+        with timed('decode'):
+            return decode_item(item)
+
 
-    def _decimal_to_float(self, obj):
-        if isinstance(obj, list):
-            return [self._decimal_to_float(i) for i in obj]
-        elif isinstance(obj, dict):
-            return {k: self._decimal_to_float(v) for k, v in obj.items()}
-        elif isinstance(obj, Decimal):
-            return float(obj)
-        else:
-            return obj
+def _game_dict(game_number, words, matrix, group_size=4):
+    # The cached float32 buffer is exposed as a 2D view without copying; the
+    # similarities were float32 to begin with, so no precision is lost
+    n = len(words)
+    adjacency_matrix = np.frombuffer(matrix, dtype=np.float32).reshape(n, n)
+    adjacency_matrix.flags.writeable = False
+    return {
+        "game_number": game_number,
+        "words": list(words),
+        "adjacency_matrix": adjacency_matrix,
+        "group_size": group_size
+    }
 
 dynamo_service = DynamoService()
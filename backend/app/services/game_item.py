@@ -0,0 +1,81 @@
+"""Item schema for the ConnectionsGames table.
+
+Format version 2 items store the symmetric adjacency matrix as a single
+Binary attribute, matrix: the upper triangle, row by row, as little-endian
+float32, optionally zlib compressed (the compression attribute says which).
+That is 544 bytes for a 16-word board instead of 256 Number attributes.
+Boards whose groups are not four words carry a group_size Number; items
+without one, legacy items included, are groups of four, so adding the
+attribute did not change the stored 4-word items or their content hashes.
+
+Legacy items have no format_version and keep adjacency_matrix as nested
+lists of Numbers; decode_item still reads those.
+
+Like game_pack, this module has no Flask or boto3 dependencies.
+"""
+import struct
+import zlib
+from array import array
+
+import numpy as np
+
+ITEM_FORMAT_VERSION = 2
+COMPRESSIONS = ('none', 'zlib')
+DEFAULT_GROUP_SIZE = 4
+
+
+def encode_matrix(matrix, compression='none'):
+    n = len(matrix)
+    triangle = [float(matrix[i][j]) for i in range(n) for j in range(i, n)]
+    blob = struct.pack(f'<{len(triangle)}f', *triangle)
+    if compression == 'zlib':
+        return zlib.compress(blob, 9)
+    if compression != 'none':
+        raise ValueError(f"Unknown compression: {compression}")
+    return blob
+
+
+def decode_matrix(blob, n, compression='none'):
+    """Full n*n float32 matrix, row-major, from an encoded upper triangle."""
+    if compression == 'zlib':
+        blob = zlib.decompress(blob)
+    elif compression != 'none':
+        raise ValueError(f"Unknown compression: {compression}")
+
+    triangle = np.frombuffer(blob, dtype='<f4', count=n * (n + 1) // 2)
+    rows, cols = np.triu_indices(n)
+    matrix = np.empty((n, n), dtype=np.float32)
+    matrix[rows, cols] = triangle
+    matrix[cols, rows] = triangle
+    return array('f', matrix.tobytes())
+
+
+def encode_item(game, compression='none'):
+    """Version 2 item for a game dict with game_number, words, adjacency_matrix and optionally group_size."""
+    item = {
+        'game_number': int(game['game_number']),
+        'format_version': ITEM_FORMAT_VERSION,
+        'words': list(game['words']),
+        'matrix': encode_matrix(game['adjacency_matrix'], compression),
+        'compression': compression
+    }
+    group_size = int(game.get('group_size', DEFAULT_GROUP_SIZE))
+    if group_size != DEFAULT_GROUP_SIZE:
+        item['group_size'] = group_size
+    return item
+
+
+def decode_item(item):
+    """(words tuple, float32 array, group size) from a low-level client item, in either format."""
+    words = tuple(word['S'] for word in item['words']['L'])
+    group_size = int(item['group_size']['N']) if 'group_size' in item else DEFAULT_GROUP_SIZE
+    if 'format_version' not in item:
+        # Legacy cells arrive as {'N': '0.52'}; float() on the strings avoids building Decimals
+        matrix = array('f', [float(cell['N']) for row in item['adjacency_matrix']['L'] for cell in row['L']])
+        return words, matrix, group_size
+
+    version = int(item['format_version']['N'])
+    if version != ITEM_FORMAT_VERSION:
+        raise ValueError(f"Unsupported item format version {version}")
+    compression = item.get('compression', {}).get('S', 'none')
+    return words, decode_matrix(item['matrix']['B'], len(words), compression), group_size
@@ -0,0 +1,190 @@
+"""Single-file binary pack of every game, read through mmap.
+
+Layout (all integers little-endian):
+
+    header      magic, version, matrix dtype, index length, word count and
+                the absolute offsets of the three sections below
+    index       u64 per game_number (0 = no such game) pointing at its block
+    words       u32 offsets into a UTF-8 blob holding every distinct word once
+    game block  u32 n, u32 group size, n u32 word ids, then the n*(n+1)/2
+                upper-triangle cells of the symmetric adjacency matrix as
+                float32 or float16
+
+Version 1 packs have no group size in their blocks; their games are read as
+groups of 4.
+
+Looking a game up is one read from the index, and its matrix cells are handed
+out as a numpy view over the mapped file, so opening the pack costs nothing
+per game and every worker process shares the same pages.
+
+This module has no Flask dependencies so extract/extract.py and
+scripts/setup_dynamodb.py can import it directly.
+"""
+import mmap
+import os
+import struct
+
+import numpy as np
+
+MAGIC = b'NYTCPACK'
+VERSION = 2
+# Versions GamePack reads; version 1 blocks have no group size
+READABLE_VERSIONS = (1, 2)
+HEADER = struct.Struct('<8sHHIIQQQ')
+HEADER_SIZE = 48
+DTYPES = {
+    'float32': (0, 'f', '<f4'),
+    'float16': (1, 'e', '<f2'),
+}
+PACK_FILENAME = 'games.pack'
+
+
+def _triangle_size(n):
+    return n * (n + 1) // 2
+
+
+def _pad(buffer, alignment=8):
+    buffer.extend(b'\0' * (-len(buffer) % alignment))
+
+
+def write_game_pack(games, path, dtype='float32'):
+    """Write games (dicts with game_number, words, adjacency_matrix and optionally group_size) to path atomically."""
+    dtype_code, struct_code, _ = DTYPES[dtype]
+    games = sorted(games, key=lambda game: game['game_number'])
+
+    word_ids = {}
+    blocks = []
+    for game in games:
+        words = game['words']
+        matrix = game['adjacency_matrix']
+        n = len(words)
+        ids = [word_ids.setdefault(word, len(word_ids)) for word in words]
+        triangle = [float(matrix[i][j]) for i in range(n) for j in range(i, n)]
+        block = bytearray(struct.pack(f'<II{n}I', n, game.get('group_size', 4), *ids))
+        block.extend(struct.pack(f'<{len(triangle)}{struct_code}', *triangle))
+        _pad(block)
+        blocks.append((int(game['game_number']), block))
+
+    encoded = [word.encode('utf-8') for word in word_ids]
+    word_offsets = [0]
+    for word in encoded:
+        word_offsets.append(word_offsets[-1] + len(word))
+
+    index_length = blocks[-1][0] + 1 if blocks else 0
+    index_offset = HEADER_SIZE
+    word_offsets_offset = index_offset + 8 * index_length
+    word_blob_offset = word_offsets_offset + 4 * len(word_offsets)
+
+    body = bytearray(struct.pack(f'<{len(word_offsets)}I', *word_offsets))
+    body.extend(b''.join(encoded))
+    _pad(body)
+
+    index = [0] * index_length
+    position = word_offsets_offset + len(body)
+    for game_number, block in blocks:
+        index[game_number] = position
+        position += len(block)
+
+    header = HEADER.pack(MAGIC, VERSION, dtype_code, index_length, len(encoded),
+                         index_offset, word_offsets_offset, word_blob_offset)
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(header.ljust(HEADER_SIZE, b'\0'))
+        f.write(struct.pack(f'<{index_length}Q', *index))
+        f.write(body)
+        for _, block in blocks:
+            f.write(block)
+    os.replace(tmp_path, path)
+    return len(blocks)
+
+
+class GamePack:
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        (magic, version, dtype_code, self._index_length, self.word_count,
+         self._index_offset, self._word_offsets_offset, self._word_blob_offset) = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version not in READABLE_VERSIONS:
+            raise ValueError(f"{path} is not a version {VERSION} game pack")
+        self.version = version
+
+        for name, (code, _, numpy_dtype) in DTYPES.items():
+            if code == dtype_code:
+                self.dtype = name
+                self._numpy_dtype = numpy_dtype
+        self._triu = {}
+
+    def __contains__(self, game_number):
+        return self._block(game_number) is not None
+
+    def game_numbers(self):
+        return [game_number for game_number in range(self._index_length) if game_number in self]
+
+    def word(self, word_id):
+        start, end = struct.unpack_from('<II', self._mm, self._word_offsets_offset + 4 * word_id)
+        return self._mm[self._word_blob_offset + start:self._word_blob_offset + end].decode('utf-8')
+
+    def words(self, game_number):
+        block = self._block(game_number)
+        if block is None:
+            return None
+        ids_offset, n, _ = block
+        return [self.word(word_id) for word_id in struct.unpack_from(f'<{n}I', self._mm, ids_offset)]
+
+    def triangle(self, game_number):
+        """Upper-triangle cells, row by row: a read-only view into the mapped file."""
+        block = self._block(game_number)
+        if block is None:
+            return None
+        ids_offset, n, _ = block
+        start = ids_offset + 4 * n
+        return np.frombuffer(self._mm, dtype=self._numpy_dtype, count=_triangle_size(n), offset=start)
+
+    def matrix(self, game_number):
+        block = self._block(game_number)
+        if block is None:
+            return None
+        n = block[1]
+        triangle = self.triangle(game_number)
+
+        rows, cols = self._triu_indices(n)
+        matrix = np.empty((n, n), dtype=np.float32)
+        matrix[rows, cols] = triangle
+        matrix[cols, rows] = triangle
+        return matrix
+
+    def get_game(self, game_number):
+        block = self._block(game_number)
+        if block is None:
+            return None
+        return {
+            "game_number": game_number,
+            "words": self.words(game_number),
+            "adjacency_matrix": self.matrix(game_number),
+            "group_size": block[2]
+        }
+
+    def close(self):
+        self._mm.close()
+
+    def _block(self, game_number):
+        if not 0 <= game_number < self._index_length:
+            return None
+        offset, = struct.unpack_from('<Q', self._mm, self._index_offset + 8 * game_number)
+        if not offset:
+            return None
+        # (offset of the word ids, board size, group size)
+        if self.version == 1:
+            n, = struct.unpack_from('<I', self._mm, offset)
+            return offset + 4, n, 4
+        n, group_size = struct.unpack_from('<II', self._mm, offset)
+        return offset + 8, n, group_size
+
+    def _triu_indices(self, n):
+        indices = self._triu.get(n)
+        if indices is None:
+            indices = np.triu_indices(n)
+            self._triu[n] = indices
+        return indices
@@ -2,32 +2,62 @@ import json
 import random
 import os
 from pathlib import Path
+from app.services.game_pack import GamePack, PACK_FILENAME
+from app.services.game_storage import GameStorage
+
+class GameService(GameStorage):
+    """Games shipped with the app in public/data, read from the game pack or the JSON files."""
+
+    name = 'local'
 
-class GameService:
     def __init__(self):
         self.data_dir = Path(__file__).parent.parent.parent.parent / 'public' / 'data'
+        pack_path = self.data_dir / PACK_FILENAME
+        self.pack = GamePack(str(pack_path)) if pack_path.exists() else None
+        self._game_ids = None
+        self._json_games = {}
 
     def get_game(self, game_id):
+        if self.pack is not None:
+            return self.pack.get_game(int(game_id))
+
+        game_id = int(game_id)
+        if game_id in self._json_games:
+            return self._json_games[game_id]
+
         file_path = self.data_dir / f'game_{game_id}.json'
         if not file_path.exists():
             return None
         
         with open(file_path, 'r') as f:
             data = json.load(f)
+        self._json_games[game_id] = data
         return data
 
     def get_random_game_id(self):
-        files = list(self.data_dir.glob('game_*.json'))
-        if not files:
-            return None
-        
-        random_file = random.choice(files)
-        # Extract ID from filename game_123.json
-        try:
-            game_id = int(random_file.stem.split('_')[1])
-            return game_id
-        except (IndexError, ValueError):
+        game_ids = self.game_ids()
+        if not game_ids:
             return None
+        return random.choice(game_ids)
+
+    def game_ids(self):
+        # Listed once; the data directory only changes on deploy
+        if self._game_ids is None:
+            if self.pack is not None:
+                self._game_ids = tuple(self.pack.game_numbers())
+            else:
+                game_ids = []
+                for path in self.data_dir.glob('game_*.json'):
+                    # Extract ID from filename game_123.json
+                    try:
+                        game_ids.append(int(path.stem.split('_')[1]))
+                    except (IndexError, ValueError):
+                        continue
+                self._game_ids = tuple(sorted(game_ids))
+        return self._game_ids
+
+    def cache_stats(self):
+        return {"games": len(self.game_ids()), "source": 'pack' if self.pack is not None else 'json'}
 
     def check_guess(self, game_id, guess_words):
         game_data = self.get_game(game_id)
@@ -0,0 +1,64 @@
+import random
+
+
+class GameStorage:
+    """Where games are read from; the routes only talk to this interface.
+
+    Implementations provide get_game and game_ids. get_games, prefetch and
+    the background index refresh have defaults that backends with bulk
+    reads or remote indexes override.
+    """
+
+    name = None
+
+    def get_game(self, game_id):
+        raise NotImplementedError
+
+    def game_ids(self):
+        raise NotImplementedError
+
+    def get_games(self, game_ids):
+        games = {}
+        for game_id in set(int(game_id) for game_id in game_ids):
+            game = self.get_game(game_id)
+            if game:
+                games[game_id] = game
+        return games
+
+    def get_random_game(self):
+        game_ids = self.game_ids()
+        if not game_ids:
+            return None
+        return self.get_game(random.choice(game_ids))
+
+    def prefetch(self, game_ids=None):
+        return 0
+
+    def start_index_refresh(self):
+        pass
+
+    def cache_stats(self):
+        return {}
+
+
+class InMemoryStorage(GameStorage):
+    """Games held in a dict, for tests and benchmarks."""
+
+    name = 'memory'
+
+    def __init__(self, games=()):
+        self.games = {}
+        self.put_games(games)
+
+    def put_games(self, games):
+        for game in games:
+            self.games[int(game['game_number'])] = game
+
+    def get_game(self, game_id):
+        return self.games.get(int(game_id))
+
+    def game_ids(self):
+        return tuple(sorted(self.games))
+
+    def cache_stats(self):
+        return {"games": len(self.games)}
@@ -0,0 +1,192 @@
+"""Process-local counters and histograms, rendered in Prometheus text format.
+
+A deliberately small stand-in for prometheus_client: observing a value is a
+lock, a bucket search and two additions, cheap enough to leave on for
+every request. Each worker process keeps its own numbers, so scrape every
+instance (or aggregate by instance label) when running several.
+
+timed(stage) records a stage duration both into stage_seconds and into the
+current request's timings, which create_app turns into a Server-Timing
+header.
+"""
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# Stage durations of the request being handled: stage -> seconds
+_request_timings = contextvars.ContextVar('request_timings', default=None)
+
+
+def _label_text(labelnames, values):
+    if not labelnames:
+        return ''
+    pairs = ','.join(f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values))
+    return '{' + pairs + '}'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Counter:
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_label_text(self.labelnames, key)} {value}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts (last is +Inf), sum]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for key, (counts, total) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float('inf'),), counts):
+                    cumulative += count
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    labels = _label_text(self.labelnames + ('le',), key + (le,))
+                    lines.append(f'{self.name}_bucket{labels} {cumulative}')
+                labels = _label_text(self.labelnames, key)
+                lines.append(f'{self.name}_sum{labels} {total}')
+                lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+
+class Collected:
+    """Values read from a callback at scrape time, for stats other services already keep.
+
+    fn returns a list of (labels dict, value).
+    """
+
+    def __init__(self, name, help, type, fn):
+        self.name = name
+        self.help = help
+        self.type = type
+        self.fn = fn
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.type}']
+        try:
+            samples = self.fn()
+        except Exception as e:
+            print(f"Error collecting {self.name}: {e}")
+            return lines
+        for labels, value in samples:
+            lines.append(f'{self.name}{_label_text(tuple(labels), tuple(labels.values()))} {value}')
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics = [m for m in self._metrics if m.name != metric.name] + [metric]
+        return metric
+
+    def counter(self, name, help, labelnames=()):
+        return self.register(Counter(name, help, labelnames))
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def collect(self, name, help, type, fn):
+        return self.register(Collected(name, help, type, fn))
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+request_seconds = registry.histogram(
+    'nytc_http_request_duration_seconds', 'Time spent handling API requests.', ('method', 'endpoint', 'status'))
+stage_seconds = registry.histogram(
+    'nytc_stage_duration_seconds', 'Time spent in each stage of request handling.', ('stage',))
+storage_errors = registry.counter(
+    'nytc_storage_errors_total', 'Storage calls that failed.', ('backend', 'operation'))
+game_cache_requests = registry.counter(
+    'nytc_game_cache_requests_total', 'Game cache lookups by result.', ('result',))
+
+# Start-up phase -> seconds for this process, filled in by create_app, warmup and the first request
+startup_seconds = {}
+registry.collect('nytc_startup_seconds', 'Time this process spent in each start-up phase.', 'gauge',
+                 lambda: [({'phase': phase}, seconds) for phase, seconds in sorted(startup_seconds.items())])
+
+
+def start_request():
+    return _request_timings.set({})
+
+
+def end_request(token):
+    timings = _request_timings.get()
+    _request_timings.reset(token)
+    return timings or {}
+
+
+def record(stage, seconds):
+    stage_seconds.observe(seconds, stage=stage)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+@contextmanager
+def timed(stage):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - started)
+
+
+def server_timing(timings, total=None):
+    """Server-Timing header value, durations in milliseconds."""
+    parts = [f'{stage};dur={seconds * 1000:.2f}' for stage, seconds in timings.items()]
+    if total is not None:
+        parts.append(f'total;dur={total * 1000:.2f}')
+    return ', '.join(parts)
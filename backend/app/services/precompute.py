@@ -0,0 +1,115 @@
+import os
+import queue
+import threading
+from collections import OrderedDict
+
+# Finished keys remembered until a request claims them
+READY_LIMIT = 4096
+
+
+class Precomputer:
+    """Speculative work run by a few daemon threads off a bounded queue.
+
+    submit(key, fn) queues fn unless the key is already queued or running,
+    the caller says its result is cached already, or the queue is full; work
+    that does not fit is dropped rather than waited for, since it is only a
+    guess at what a request will need. claim(key) is called by the request
+    that would use the result and records whether it was ready in time.
+    Threads start on the first submit, so a forked worker starts its own.
+    """
+
+    def __init__(self, workers=None, queue_size=None):
+        self.workers = int(os.getenv('PRECOMPUTE_WORKERS', 1)) if workers is None else workers
+        self.queue_size = int(os.getenv('PRECOMPUTE_QUEUE_SIZE', 16)) if queue_size is None else queue_size
+        self._queue = queue.Queue(maxsize=max(1, self.queue_size))
+        self._lock = threading.Lock()
+        self._threads = []
+        # Keys queued or running, and keys finished but not yet claimed
+        self._pending = set()
+        self._ready = OrderedDict()
+        self.jobs = {"queued": 0, "dropped": 0, "skipped": 0, "done": 0, "failed": 0}
+        self.claims = {"hit": 0, "late": 0, "evicted": 0, "unscheduled": 0, "cached": 0}
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def submit(self, key, fn, cached=False):
+        """Queue fn() for key; returns whether it was queued."""
+        if self.workers <= 0:
+            return False
+        with self._lock:
+            if cached or key in self._pending:
+                self.jobs["skipped"] += 1
+                return False
+            try:
+                self._queue.put_nowait((key, fn))
+            except queue.Full:
+                self.jobs["dropped"] += 1
+                return False
+            self._pending.add(key)
+            self.jobs["queued"] += 1
+            if not self._threads:
+                for i in range(self.workers):
+                    thread = threading.Thread(target=self._run, name=f'precompute-{i}', daemon=True)
+                    thread.start()
+                    self._threads.append(thread)
+        return True
+
+    def claim(self, key, cached):
+        """Record how a request for key fared and return it.
+
+        hit: precomputed and still cached. late: still queued or running.
+        evicted: precomputed but gone from the cache. unscheduled: never
+        submitted, or dropped. cached: served from the cache without this
+        precompute's help (warmup or an earlier request).
+        """
+        with self._lock:
+            if self._ready.pop(key, None) is not None:
+                result = "hit" if cached else "evicted"
+            elif key in self._pending:
+                result = "late"
+            else:
+                result = "cached" if cached else "unscheduled"
+            self.claims[result] += 1
+        return result
+
+    def stats(self):
+        with self._lock:
+            # Solves that found the ranking cached anyway say nothing about precompute
+            claimed = sum(self.claims.values()) - self.claims["cached"]
+            return {
+                "workers": self.workers,
+                "queue_size": self.queue_size,
+                "pending": len(self._pending),
+                "jobs": dict(self.jobs),
+                "claims": dict(self.claims),
+                "hit_rate": self.claims["hit"] / claimed if claimed else 0.0
+            }
+
+    def _run(self):
+        while True:
+            key, fn = self._queue.get()
+            try:
+                fn()
+                succeeded = True
+            except Exception as e:
+                succeeded = False
+                print(f"Error precomputing {key}: {e}")
+            with self._lock:
+                self._pending.discard(key)
+                if succeeded:
+                    self.jobs["done"] += 1
+                    self._ready[key] = True
+                    while len(self._ready) > READY_LIMIT:
+                        self._ready.popitem(last=False)
+                else:
+                    self.jobs["failed"] += 1
+
+    def _after_fork(self):
+        # The parent's queued work and threads are not the child's
+        self._queue = queue.Queue(maxsize=max(1, self.queue_size))
+        self._lock = threading.Lock()
+        self._threads = []
+        self._pending = set()
+
+
+precomputer = Precomputer()
@@ -0,0 +1,106 @@
+import os
+import random
+import threading
+from collections import deque
+
+from app.services.metrics import storage_errors
+from app.services.storage import storage
+
+
+class RandomGamePool:
+    """Ready-to-serve random games, topped up by a background thread.
+
+    source provides game_ids() and get_games(ids). take() only pops from
+    memory; when the pool drops below half full the refill thread fetches
+    the shortfall in one get_games call, so /random waits on storage only
+    if the pool has run dry.
+    """
+
+    def __init__(self, source, size=None):
+        self.source = source
+        self.size = int(os.getenv('RANDOM_POOL_SIZE', 16)) if size is None else size
+        self.low_water = max(1, self.size // 2)
+        self._games = deque()
+        self._lock = threading.Lock()
+        self._wanted = threading.Event()
+        self._thread = None
+        self.hits = 0
+        self.misses = 0
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def take(self):
+        with self._lock:
+            game = self._games.popleft() if self._games else None
+            if game is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+            low = len(self._games) < self.low_water
+        if low and self.size > 0:
+            self.refill_async()
+        if game is not None:
+            return game
+
+        # Pool ran dry: fetch one game directly
+        game_ids = self.source.game_ids()
+        if not game_ids:
+            return None
+        game_id = random.choice(game_ids)
+        return self.source.get_games([game_id]).get(game_id)
+
+    def refill_async(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='random-game-pool', daemon=True)
+                self._thread.start()
+        self._wanted.set()
+
+    def refill(self):
+        """Fetch enough random games to fill the pool; returns how many were added."""
+        with self._lock:
+            needed = self.size - len(self._games)
+        game_ids = self.source.game_ids()
+        if needed <= 0 or not game_ids:
+            return 0
+
+        chosen = random.sample(game_ids, min(needed, len(game_ids)))
+        games = self.source.get_games(chosen)
+        fetched = [games[game_id] for game_id in chosen if game_id in games]
+        with self._lock:
+            self._games.extend(fetched)
+            while len(self._games) > self.size:
+                self._games.pop()
+        return len(fetched)
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "ready": len(self._games),
+                "size": self.size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0
+            }
+
+    def _after_fork(self):
+        # Each worker starts from the games the parent filled the pool with,
+        # in its own order so workers don't deal the same sequence
+        self._lock = threading.Lock()
+        self._wanted = threading.Event()
+        self._thread = None
+        random.shuffle(self._games)
+
+    def _run(self):
+        while True:
+            self._wanted.wait()
+            self._wanted.clear()
+            try:
+                self.refill()
+            except Exception as e:
+                storage_errors.inc(backend=self.source.name, operation='refill')
+                print(f"Error refilling random game pool: {e}")
+
+
+random_game_pool = RandomGamePool(storage)
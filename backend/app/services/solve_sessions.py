@@ -0,0 +1,137 @@
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+from app.services.ai_solver import guess_mask
+
+
+class SolveSession:
+    """One player's board: the remaining candidates, solved words and wrong guesses.
+
+    The candidates start as the full board's ranking and are narrowed with
+    RankedSuggestions.without() as groups are solved, so later requests
+    never refetch the game or rescore anything.
+    """
+
+    def __init__(self, token, game_id, perm, ranked, group_size=4):
+        self.token = token
+        self.game_id = game_id
+        self.perm = perm
+        self.group_size = group_size
+        self.inv_perm = {original: shuffled for shuffled, original in enumerate(perm)}
+        self.ranked = ranked
+        self.removed_mask = 0
+        self.solved_groups = []
+        self.bad_guess_masks = []
+        self.lock = threading.Lock()
+        self.last_used = time.monotonic()
+
+    def solve_group(self, group, original_indices):
+        mask = guess_mask(original_indices)
+        self.removed_mask |= mask
+        self.solved_groups.append(group)
+        self.ranked = self.ranked.without(mask)
+
+    def add_bad_guess(self, original_indices):
+        mask = guess_mask(original_indices)
+        if mask not in self.bad_guess_masks:
+            self.bad_guess_masks.append(mask)
+
+    def page(self, cursor, limit):
+        """(suggestions in original indices, next cursor or None)."""
+        suggestions = self.ranked.page(cursor, limit, exclude=self.bad_guess_masks)
+        next_cursor = cursor + limit if cursor + limit < self.ranked.count(self.bad_guess_masks) else None
+        return suggestions, next_cursor
+
+
+class SessionStore:
+    """Solve sessions by token, dropped after SOLVE_SESSION_TTL idle seconds.
+
+    Sessions live in this process's memory; a client whose token is unknown
+    (expired, evicted, or served by another instance) falls back to the
+    stateless /solve endpoint or opens a new session. Besides the session
+    count, the store is bounded by the estimated bytes of the sessions'
+    rankings, counted like SuggestionCache counts its entries; the least
+    recently used sessions are evicted first.
+    """
+
+    def __init__(self, ttl=None, max_sessions=None, max_bytes=None):
+        self.ttl = float(os.getenv('SOLVE_SESSION_TTL', 900)) if ttl is None else ttl
+        self.max_sessions = int(os.getenv('SOLVE_SESSION_MAX', 10000)) if max_sessions is None else max_sessions
+        if max_bytes is None:
+            max_bytes = int(os.getenv('SOLVE_SESSION_MAX_BYTES', 64 * 1024 * 1024))
+        self.max_bytes = max_bytes
+        # token -> (SolveSession, estimated bytes), least recently used first
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.created = 0
+        self.expired = 0
+        self.evictions = 0
+
+    def create(self, game_id, perm, ranked, group_size=4):
+        session = SolveSession(secrets.token_urlsafe(16), game_id, perm, ranked, group_size)
+        size = ranked.nbytes
+        with self._lock:
+            self._expire()
+            self._sessions[session.token] = (session, size)
+            self.current_bytes += size
+            self.created += 1
+            self._evict()
+        return session
+
+    def get(self, token):
+        with self._lock:
+            self._expire()
+            entry = self._sessions.get(token)
+            if entry is None:
+                return None
+            entry[0].last_used = time.monotonic()
+            self._sessions.move_to_end(token)
+            return entry[0]
+
+    def resize(self, session):
+        """Recount a session's bytes after its ranking changed, e.g. once a group is solved."""
+        size = session.ranked.nbytes
+        with self._lock:
+            entry = self._sessions.get(session.token)
+            if entry is None or entry[0] is not session:
+                return
+            self._sessions[session.token] = (session, size)
+            self.current_bytes += size - entry[1]
+            self._evict()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "active": len(self._sessions),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "created": self.created,
+                "expired": self.expired,
+                "evictions": self.evictions,
+                "ttl": self.ttl
+            }
+
+    def _evict(self):
+        # The newest session stays even when it alone is over the byte budget
+        while len(self._sessions) > 1 and (len(self._sessions) > self.max_sessions or self.current_bytes > self.max_bytes):
+            _, (_, size) = self._sessions.popitem(last=False)
+            self.current_bytes -= size
+            self.evictions += 1
+
+    def _expire(self):
+        # Least recently used first, so stop at the first live session
+        cutoff = time.monotonic() - self.ttl
+        while self._sessions:
+            token, (session, size) = next(iter(self._sessions.items()))
+            if session.last_used >= cutoff:
+                break
+            del self._sessions[token]
+            self.current_bytes -= size
+            self.expired += 1
+
+
+solve_sessions = SessionStore()
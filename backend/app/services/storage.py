@@ -0,0 +1,43 @@
+import os
+import threading
+
+
+def create_storage(backend=None):
+    """Storage named by backend or GAME_STORAGE: dynamodb (default), local or memory."""
+    backend = backend or os.getenv('GAME_STORAGE', 'dynamodb')
+    if backend == 'dynamodb':
+        from app.services.dynamo_service import dynamo_service
+        return dynamo_service
+    if backend == 'local':
+        from app.services.game_service import game_service
+        return game_service
+    if backend == 'memory':
+        from app.services.game_storage import InMemoryStorage
+        return InMemoryStorage()
+    raise ValueError(f"Unknown GAME_STORAGE backend: {backend}")
+
+
+class LazyStorage:
+    """The configured storage, built the first time any of its attributes is read.
+
+    Importing the routes therefore opens no connections and reads no files;
+    that happens on the first request, or in warmup() before workers fork.
+    """
+
+    def __init__(self, backend=None):
+        self._name = backend
+        self._backend = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        if self._backend is None:
+            with self._lock:
+                if self._backend is None:
+                    self._backend = create_storage(self._name)
+        return self._backend
+
+    def __getattr__(self, name):
+        return getattr(self.get(), name)
+
+
+storage = LazyStorage()
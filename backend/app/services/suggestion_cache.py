@@ -0,0 +1,136 @@
+import os
+import threading
+from collections import OrderedDict
+
+from app.services.ai_solver import guess_mask
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SuggestionCache:
+    """LRU cache of ranked suggestions keyed by (game_id, remaining-words bitmask).
+
+    A ranking depends only on the game and which words are still on the board,
+    so entries are stored unfiltered and bad guesses are skipped when a page is
+    read. Rankings that depend on more than that (partition mode, which
+    excludes bad guesses inside its search) pass a hashable variant that
+    becomes part of the key. Size is bounded by the estimated bytes of the cached rankings, and
+    concurrent misses for the same key wait on a single computation.
+    """
+
+    def __init__(self, max_bytes=None):
+        if max_bytes is None:
+            max_bytes = int(os.getenv('SUGGESTION_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(game_id, available_indices, variant=None):
+        if variant is None:
+            return (int(game_id), guess_mask(available_indices))
+        return (int(game_id), guess_mask(available_indices), variant)
+
+    def get_ranked(self, game_id, available_indices, compute, variant=None, warm=False):
+        """Return the cached ranking for this board, calling compute() on a miss.
+
+        compute() returns a RankedSuggestions, or None when the game does not
+        exist, in which case nothing is cached. warm=True is for filling the
+        cache ahead of requests: it shares in-flight computations like any
+        lookup but leaves the hit, miss and coalesced counts to requests.
+        """
+        key = self.key(game_id, available_indices, variant)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                if not warm:
+                    self.hits += 1
+                return entry[0]
+
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                self._inflight[key] = flight
+                if not warm:
+                    self.misses += 1
+            elif not warm:
+                self.coalesced += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = compute()
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+                if flight.value is not None:
+                    self._store(key, flight.value)
+            flight.done.set()
+
+        return flight.value
+
+    def put(self, game_id, available_indices, ranked, variant=None):
+        with self._lock:
+            self._store(self.key(game_id, available_indices, variant), ranked)
+
+    def contains(self, game_id, available_indices, variant=None):
+        with self._lock:
+            return self.key(game_id, available_indices, variant) in self._entries
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
+
+    def _store(self, key, ranked):
+        size = ranked.nbytes
+        if size > self.max_bytes:
+            return
+
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.current_bytes -= old[1]
+
+        self._entries[key] = (ranked, size)
+        self.current_bytes += size
+        while self.current_bytes > self.max_bytes:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self.current_bytes -= evicted_size
+            self.evictions += 1
+
+suggestion_cache = SuggestionCache()
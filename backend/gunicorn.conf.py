@@ -0,0 +1,13 @@
+# gunicorn -c gunicorn.conf.py run:app
+#
+# Loads the app, and with it the game corpus and solver tables (APP_WARMUP),
+# once in the master; workers are forked from it and share that memory
+# copy-on-write. Each worker opens its own DynamoDB connections and starts
+# its background threads on its first request.
+import os
+
+os.environ.setdefault('APP_WARMUP', '1')
+
+bind = os.getenv('BIND', '0.0.0.0:5000')
+workers = int(os.getenv('WEB_CONCURRENCY', 2))
+preload_app = True
@@ -0,0 +1,70 @@
+"""group_size survives every storage format: the game pack, DynamoDB items and the decoded game dicts."""
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.dynamo_service import _game_dict
+from app.services.game_item import decode_item, encode_item
+from app.services.game_pack import GamePack, write_game_pack
+
+
+def _game(game_number, size, group_size=None):
+    rng = np.random.default_rng(game_number)
+    matrix = rng.random((size, size), dtype=np.float32)
+    matrix = (matrix + matrix.T) / 2
+    game = {
+        "game_number": game_number,
+        "words": [f'WORD{game_number}_{i}' for i in range(size)],
+        "adjacency_matrix": matrix.tolist()
+    }
+    if group_size is not None:
+        game["group_size"] = group_size
+    return game
+
+
+def _client_item(item):
+    # What the low-level DynamoDB client hands back for an encode_item item
+    typed = {}
+    for key, value in item.items():
+        if isinstance(value, bytes):
+            typed[key] = {'B': value}
+        elif isinstance(value, int):
+            typed[key] = {'N': str(value)}
+        elif isinstance(value, str):
+            typed[key] = {'S': value}
+        else:
+            typed[key] = {'L': [{'S': word} for word in value]}
+    return typed
+
+
+def test_game_pack_round_trip(tmp_path):
+    games = [_game(1, 16), _game(2, 25, 5), _game(3, 36, 6)]
+    path = str(tmp_path / 'games.pack')
+    write_game_pack(games, path)
+
+    pack = GamePack(path)
+    for game in games:
+        loaded = pack.get_game(game["game_number"])
+        assert loaded["group_size"] == game.get("group_size", 4)
+        assert loaded["words"] == game["words"]
+        np.testing.assert_allclose(loaded["adjacency_matrix"], game["adjacency_matrix"], rtol=1e-6)
+    pack.close()
+
+
+def test_item_round_trip():
+    for compression in ('none', 'zlib'):
+        for game in (_game(1, 16), _game(2, 25, 5)):
+            item = encode_item(game, compression)
+            words, matrix, group_size = decode_item(_client_item(item))
+            loaded = _game_dict(game["game_number"], words, matrix, group_size)
+            assert loaded["group_size"] == game.get("group_size", 4)
+            assert loaded["words"] == game["words"]
+            np.testing.assert_allclose(loaded["adjacency_matrix"], game["adjacency_matrix"], rtol=1e-6)
+
+
+def test_four_word_items_unchanged():
+    # No group_size attribute, so items stored before it existed keep their content hashes
+    assert 'group_size' not in encode_item(_game(1, 16))
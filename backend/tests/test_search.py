@@ -0,0 +1,77 @@
+"""search_top_k's pruned search returns exactly what enumerating every group does."""
+import itertools
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.ai_solver import AISolver
+
+
+def _matrix(seed, size):
+    rng = np.random.default_rng(seed)
+    matrix = rng.random((size, size), dtype=np.float32).astype(np.float64)
+    matrix = (matrix + matrix.T) / 2
+    np.fill_diagonal(matrix, 0)
+    return matrix
+
+
+def _brute_force(solver, matrix, available, group_size, bad_guesses=()):
+    # Score every group the slow way, best first, ties in combination order
+    excluded = {frozenset(guess) for guess in bad_guesses}
+    scored = []
+    for combo in itertools.combinations(sorted(available), group_size):
+        combo = list(combo)
+        if frozenset(combo) in excluded:
+            continue
+        score = (solver.weights[0] * solver.calc_conductance(combo, matrix)
+                 + solver.weights[1] * solver.calc_density(combo, matrix))
+        scored.append((-score, combo))
+    scored.sort()
+    return [(list(combo), -score) for score, combo in scored]
+
+
+def _assert_matches(found, expected):
+    assert [sorted(s['words']) for s in found] == [words for words, _ in expected[:len(found)]]
+    assert np.allclose([s['score'] for s in found], [score for _, score in expected[:len(found)]])
+
+
+def test_search_matches_enumeration_on_full_boards():
+    solver = AISolver()
+    for seed in range(5):
+        matrix = _matrix(seed, 16)
+        available = list(range(16))
+        expected = _brute_force(solver, matrix, available, 4)
+        for k in (1, 5, 50, len(expected)):
+            found, complete = solver.search_top_k(matrix, available, k)
+            assert complete
+            assert len(found) == k
+            _assert_matches(found, expected)
+
+
+def test_search_matches_enumeration_with_bad_guesses_and_solved_words():
+    solver = AISolver()
+    matrix = _matrix(7, 16)
+    # One group solved and masked out the way autosolve does it
+    for i in range(4):
+        matrix[i, :] = -1
+        matrix[:, i] = -1
+    available = list(range(4, 16))
+    bad_guesses = [[4, 5, 6, 8], [9, 10, 11, 12]]
+    expected = _brute_force(solver, matrix, available, 4, bad_guesses)
+    found, complete = solver.search_top_k(matrix, available, 40, bad_guesses)
+    assert complete
+    _assert_matches(found, expected)
+
+
+def test_search_matches_rank_for_other_group_sizes():
+    solver = AISolver()
+    matrix = _matrix(3, 16)
+    available = list(range(16))
+    for group_size in (2, 3, 8):
+        ranked = solver.rank(matrix, available, group_size=group_size).top(30)
+        found, complete = solver.search_top_k(matrix, available, 30, group_size=group_size)
+        assert complete
+        assert [s['words'] for s in found] == [s['words'] for s in ranked]
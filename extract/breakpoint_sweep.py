@@ -0,0 +1,103 @@
+import numpy as np
+from tqdm import tqdm
+
+from feature_store import NUM_STATES
+
+
+def _state_ranks(conductance, density, labels, lo, hi):
+    """Rank and group of the best-placed correct combo, piecewise over t in [lo, hi].
+
+    With weights [1 - t, t] a combo's score is a line in t, so a correct combo
+    c changes rank only where another combo's line crosses its own. Returns
+    (grid, ranks, groups) where segment k spans grid[k]..grid[k + 1].
+    """
+    index = np.arange(len(conductance))
+    starts, event_times, event_deltas = [], [], []
+
+    correct = np.flatnonzero(labels >= 0)
+    for c in correct:
+        # margin(t) = score_c - score_x; x ranks above c while it is negative,
+        # and on an exact tie when x comes first in combination order
+        dc = conductance[c] - conductance
+        slope = (density[c] - density) - dc
+        margin = dc + lo * slope
+        above = (margin < 0) | ((margin == 0) & ((slope < 0) | ((slope == 0) & (index < c))))
+        starts.append(int(np.count_nonzero(above)))
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            crossing = -dc / slope
+        inside = (slope != 0) & (crossing > lo) & (crossing < hi)
+        order = np.argsort(crossing[inside], kind='stable')
+        event_times.append(crossing[inside][order])
+        # A falling margin means x overtakes c; a rising one means c overtakes x
+        event_deltas.append(np.where(slope[inside] < 0, 1, -1)[order])
+
+    grid = np.unique(np.concatenate([[lo, hi]] + event_times))
+    ranks = np.empty((len(correct), len(grid) - 1), dtype=np.int64)
+    for k, (start, times, deltas) in enumerate(zip(starts, event_times, event_deltas)):
+        cumulative = np.concatenate(([0], np.cumsum(deltas)))
+        ranks[k] = start + cumulative[np.searchsorted(times, grid[:-1], side='right')]
+
+    best = np.argmin(ranks, axis=0)
+    return grid, ranks[best, np.arange(len(grid) - 1)], labels[correct][best].astype(np.int64)
+
+
+def _game_events(store, game, state, lo, hi, events):
+    # Each visited state adds (rank + 1) tries on its segments; the run of t
+    # over which it finds the same group continues into that group's state
+    if state == NUM_STATES - 1 or lo >= hi:
+        return
+
+    conductance, density, labels = store.state(game, state)
+    grid, ranks, groups = _state_ranks(conductance, density, labels, lo, hi)
+    events.append((grid[:-1], ranks + 1))
+    events.append((grid[1:], -(ranks + 1)))
+
+    changes = np.flatnonzero(np.diff(groups)) + 1
+    run_starts = np.concatenate(([0], changes))
+    run_ends = np.concatenate((changes, [len(groups)]))
+    for start, end in zip(run_starts, run_ends):
+        _game_events(store, game, state | (1 << int(groups[start])), grid[start], grid[end], events)
+
+
+def tries_function(store, game, max_tries=100):
+    """Tries for one game as a step function of t: (breakpoints, values between them)."""
+    events = []
+    _game_events(store, game, 0, 0.0, 1.0, events)
+    times = np.concatenate([t for t, _ in events])
+    deltas = np.concatenate([d for _, d in events])
+
+    order = np.argsort(times, kind='stable')
+    times, values = times[order], np.cumsum(deltas[order])
+    # Collapse events that share a time; the value after the last one holds
+    last = np.concatenate((times[1:] != times[:-1], [True]))
+    breakpoints, values = times[last], values[last]
+    return breakpoints, np.minimum(values[:-1], max_tries)
+
+
+def sweep_weights(store, max_tries=100, show_progress=True):
+    """Globally optimal weights [1 - t, t] for the simulated solve loop over the whole store.
+
+    Average tries only changes where some pair of combos swaps rank, so each
+    game contributes a step function of t. Summing those gives the exact
+    corpus objective on every interval at once. Returns
+    (weights, average_tries, (t_lo, t_hi)), the middle of the best interval.
+    """
+    times, deltas = [], []
+    for game in tqdm(range(len(store)), desc="Sweeping", leave=False, disable=not show_progress):
+        breakpoints, values = tries_function(store, game, max_tries)
+        times.append(breakpoints[:-1])
+        deltas.append(np.diff(np.concatenate(([0], values))))
+
+    times = np.concatenate(times)
+    deltas = np.concatenate(deltas)
+    order = np.argsort(times, kind='stable')
+    times, totals = times[order], np.cumsum(deltas[order])
+
+    last = np.concatenate((times[1:] != times[:-1], [True]))
+    times, totals = times[last], totals[last]
+    ends = np.concatenate((times[1:], [1.0]))
+
+    best = int(np.argmin(np.where(ends > times, totals, np.iinfo(np.int64).max)))
+    t = (times[best] + ends[best]) / 2
+    return [float(1 - t), float(t)], float(totals[best] / len(store)), (float(times[best]), float(ends[best]))
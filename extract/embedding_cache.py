@@ -0,0 +1,77 @@
+import json
+import os
+
+import numpy as np
+
+MODEL_NAME = "fasttext-wiki-news-subwords-300"
+VECTORS_FILE = "vectors.npy"
+VOCAB_FILE = "vocab.json"
+
+
+class EmbeddingCache:
+    """The word vectors extraction actually uses, kept on disk next to an interned word index.
+
+    vocab.json lists the cached words (a word's position is its row in
+    vectors.npy) and the words the model is known not to have. vectors.npy is
+    memory-mapped on load, so opening the cache reads almost nothing. Exposes
+    key_to_index and vectors like gensim's KeyedVectors, so it can stand in for
+    the model in similarity_matrix().
+    """
+
+    def __init__(self, words=(), vectors=None, missing=()):
+        self.words = list(words)
+        self.key_to_index = {word: i for i, word in enumerate(self.words)}
+        self.vectors = vectors if vectors is not None else np.zeros((0, 0), dtype=np.float32)
+        self.missing = set(missing)
+
+    @classmethod
+    def load(cls, cache_dir):
+        vocab_path = os.path.join(cache_dir, VOCAB_FILE)
+        vectors_path = os.path.join(cache_dir, VECTORS_FILE)
+        if not (os.path.exists(vocab_path) and os.path.exists(vectors_path)):
+            return cls()
+
+        with open(vocab_path) as f:
+            vocab = json.load(f)
+        if vocab.get("model") != MODEL_NAME:
+            return cls()
+        return cls(vocab["words"], np.load(vectors_path, mmap_mode="r"), vocab["missing"])
+
+    def save(self, cache_dir):
+        os.makedirs(cache_dir, exist_ok=True)
+        vectors_path = os.path.join(cache_dir, VECTORS_FILE)
+        vocab_path = os.path.join(cache_dir, VOCAB_FILE)
+
+        # Written to temporary names first: the old vectors may still be mapped
+        np.save(vectors_path + ".tmp.npy", np.ascontiguousarray(self.vectors, dtype=np.float32))
+        with open(vocab_path + ".tmp", "w") as f:
+            json.dump({"model": MODEL_NAME, "words": self.words, "missing": sorted(self.missing)}, f)
+        os.replace(vectors_path + ".tmp.npy", vectors_path)
+        os.replace(vocab_path + ".tmp", vocab_path)
+
+    def unknown(self, words):
+        """Words that are neither cached nor known to be missing from the model."""
+        return {word for word in words if word not in self.key_to_index and word not in self.missing}
+
+    def add_from_model(self, words, model):
+        found = sorted(word for word in words if word in model.key_to_index)
+        self.missing.update(word for word in words if word not in model.key_to_index)
+        if not found:
+            return
+
+        new_vectors = np.asarray(model.vectors[[model.key_to_index[word] for word in found]], dtype=np.float32)
+        self.vectors = np.concatenate([self.vectors, new_vectors]) if len(self.words) else new_vectors
+        for word in found:
+            self.key_to_index[word] = len(self.words)
+            self.words.append(word)
+
+
+def load_embeddings(words, cache_dir, load_model):
+    """Embedding cache covering words, loading the full model (via load_model) only for unseen words."""
+    cache = EmbeddingCache.load(cache_dir)
+    unknown = cache.unknown(words)
+    if unknown:
+        print(f"Loading {MODEL_NAME} for {len(unknown)} uncached words")
+        cache.add_from_model(unknown, load_model())
+        cache.save(cache_dir)
+    return cache
@@ -1,92 +1,112 @@
 import re
 import json
 import os
-import gensim.downloader as api
+import hashlib
+import sys
+import argparse
+import numpy as np
 from tqdm import tqdm
 
+from embedding_cache import MODEL_NAME, load_embeddings
 
-def extract(file_path):
-    connections = []
-    
-    with open(file_path, encoding="utf8") as file:
-        lines = file.readlines()
-        
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend', 'app', 'services'))
+from game_pack import PACK_FILENAME, write_game_pack
+
+
+HEADER_PATTERN = re.compile(r"NYT Connections (\d+)")
+MANIFEST_FILE = "manifest.json"
+
+
+def iter_puzzles(file_path):
+    """Stream (puzzle number, 16 words) pairs from the word list one line at a time."""
+    number = None
     temp = []
     
-    for line in tqdm(lines, desc="Extracting"):
-        line = line.strip()
-        
-        if line.startswith("NYT Connections"):
-            continue
-        
-        if " - " in line:
-            pattern = r" - (.*)"
-            match = re.search(pattern, line)
-            if match:
-                words = match.group(1).split(", ")
-                temp.extend(words)
-        
-        if len(temp) == 16:
-            connections.append(temp)
-            temp = []
-                
-    return connections
-
-def word_similarity(word1, word2, model):
-
-    word1 = word1.lower()
-    word2 = word2.lower()
-
-    try:
-        similarity_score = model.similarity(word1, word2)
-        return similarity_score
-    except KeyError as e:
-        return None
+    with open(file_path, encoding="utf8") as file:
+        for line in file:
+            line = line.strip()
+            
+            header = HEADER_PATTERN.match(line)
+            if header:
+                number = int(header.group(1))
+                temp = []
+                continue
+            
+            if " - " in line:
+                pattern = r" - (.*)"
+                match = re.search(pattern, line)
+                if match:
+                    words = match.group(1).split(", ")
+                    temp.extend(words)
+            
+            if len(temp) == 16:
+                yield number, temp
+                temp = []
+
+
+def extract(file_path):
+    return [words for _, words in tqdm(iter_puzzles(file_path), desc="Extracting")]
+
+def similarity_matrix(words, model):
+    """Cosine similarity of every pair of words, or None plus the words the model lacks.
+
+    Each word's vector is looked up once and normalized, so the whole matrix is
+    one matrix multiply instead of n*n model.similarity calls.
+    """
+    keys = [word.lower() for word in words]
+    missing = [key for key in keys if key not in model.key_to_index]
+    if missing:
+        return None, missing
+
+    vectors = model.vectors[[model.key_to_index[key] for key in keys]]
+    vectors = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors @ vectors.T, []
 
 
 def create(word_data, model, output_dir="data"):
+    """Write a game file for every puzzle whose words are all in the model.
+
+    Returns the index entries of the written games and the set of missing words.
+    """
     os.makedirs(output_dir, exist_ok=True)
     
     valid_games = []
+    missing_words = set()
     game_number = 0
     
     for words in tqdm(word_data, desc="Processing"):
-        matrix = []
-        simil = None
-        
-        for target in words:
-            temp = []
-            for word in words:
-                simil = word_similarity(target, word, model)
-                if simil is None:
-                    break
-                temp.append(float(simil))
-
-            if simil is None:
-                break
-            matrix.append(temp)
-
-        if simil is not None:
+        matrix, missing = similarity_matrix(words, model)
+        missing_words.update(missing)
+
+        if matrix is not None:
             game_data = {
                 "game_number": game_number,
                 "words": words,
-                "adjacency_matrix": matrix
+                "adjacency_matrix": matrix.tolist()
             }
             
-            filename = f"game_{game_number}.json"
-            filepath = os.path.join(output_dir, filename)
-            
-            with open(filepath, 'w') as f:
-                json.dump(game_data, f, indent=2)
-            
             valid_games.append({
                 "game_number": game_number,
-                "filename": filename
+                "filename": write_game(game_data, output_dir)
             })
             
             game_number += 1
     
-    return valid_games
+    return valid_games, missing_words
+
+
+def write_game(game_data, output_dir="data"):
+    filename = f"game_{game_data['game_number']}.json"
+    with open(os.path.join(output_dir, filename), 'w') as f:
+        json.dump(game_data, f, indent=2)
+    return filename
+
+
+def write_json_atomic(path, data):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
 
 
 def create_games_index(valid_games, output_dir="data"):
@@ -95,34 +115,163 @@ def create_games_index(valid_games, output_dir="data"):
         "games": valid_games
     }
     
-    index_filepath = os.path.join(output_dir, "games_index.json")
-    with open(index_filepath, 'w') as f:
-        json.dump(index_data, f, indent=2)
+    write_json_atomic(os.path.join(output_dir, "games_index.json"), index_data)
 
 
-def clean(word_data, model):
-    missing_words = set()
-    
-    for words in tqdm(word_data, desc="Checking"):
-        for target in words:
-            target = target.lower()
-            try:
-                similarity_score = model.similarity(target, target)
-            except KeyError:
-                missing_words.add(target)
-    
-    return missing_words
+def puzzle_hash(words):
+    # The model name is part of the hash so switching embeddings recomputes everything
+    return hashlib.sha1("\n".join([MODEL_NAME] + words).encode("utf8")).hexdigest()
+
+
+def bootstrap_manifest(input_file, output_dir="data"):
+    """Manifest for games written by a full run, matched to puzzle numbers by their words.
+
+    Returns the manifest and the index entries that match no puzzle.
+    """
+    index_path = os.path.join(output_dir, "games_index.json")
+    if not os.path.exists(index_path):
+        return {}, []
+
+    with open(index_path) as f:
+        index_data = json.load(f)
+
+    existing = {}
+    for entry in index_data["games"]:
+        with open(os.path.join(output_dir, entry["filename"])) as f:
+            existing[tuple(json.load(f)["words"])] = entry
+
+    manifest = {}
+    for number, words in iter_puzzles(input_file):
+        entry = existing.pop(tuple(words), None)
+        if entry is not None:
+            manifest[str(number)] = {
+                "hash": puzzle_hash(words),
+                "game_number": entry["game_number"],
+                "filename": entry["filename"]
+            }
+    return manifest, list(existing.values())
+
+
+def extract_incremental(input_file, output_dir, cache_dir, load_model):
+    """Recompute only puzzles that are new or whose words changed since the last run.
+
+    Games keep the game_number recorded for their NYT puzzle number, and new
+    puzzles are numbered after the highest existing one, so adding a day
+    writes one file. Returns (games written, games removed, games in the index).
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    manifest_path = os.path.join(output_dir, MANIFEST_FILE)
+    removed = 0
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            manifest = json.load(f)["puzzles"]
+    else:
+        manifest, stale = bootstrap_manifest(input_file, output_dir)
+        # Games that span two puzzles (written before puzzles were split on
+        # their headers) are removed; their puzzles are recomputed below
+        for entry in stale:
+            os.remove(os.path.join(output_dir, entry["filename"]))
+        if stale:
+            print(f"Removed {len(stale)} games that match no puzzle")
+        removed += len(stale)
+
+    pending = []
+    for number, words in iter_puzzles(input_file):
+        entry = manifest.get(str(number))
+        if entry is None or entry["hash"] != puzzle_hash(words):
+            pending.append((number, words))
+
+    written = 0
+    if pending:
+        words_needed = {word.lower() for _, words in pending for word in words}
+        model = load_embeddings(words_needed, cache_dir, load_model)
+        next_number = max((e["game_number"] for e in manifest.values() if "game_number" in e), default=-1) + 1
+
+        # Oldest puzzles first, so new games are numbered in release order
+        for number, words in sorted(pending):
+            entry = manifest.get(str(number), {})
+            matrix, missing = similarity_matrix(words, model)
+            if matrix is None:
+                if "filename" in entry:
+                    os.remove(os.path.join(output_dir, entry["filename"]))
+                    removed += 1
+                manifest[str(number)] = {"hash": puzzle_hash(words), "missing": missing}
+                continue
+
+            game_number = entry.get("game_number")
+            if game_number is None:
+                game_number = next_number
+                next_number += 1
+            game_data = {
+                "game_number": game_number,
+                "words": words,
+                "adjacency_matrix": matrix.tolist()
+            }
+            manifest[str(number)] = {
+                "hash": puzzle_hash(words),
+                "game_number": game_number,
+                "filename": write_game(game_data, output_dir)
+            }
+            written += 1
+
+    valid_games = sorted(
+        ({"game_number": e["game_number"], "filename": e["filename"]} for e in manifest.values() if "filename" in e),
+        key=lambda e: e["game_number"]
+    )
+    create_games_index(valid_games, output_dir)
+    write_json_atomic(manifest_path, {"version": 1, "puzzles": manifest})
+    return written, removed, len(valid_games)
+
+
+def create_game_pack(output_dir="data", dtype="float32"):
+    """Bundle every game listed in games_index.json into a single mmap-able pack."""
+    with open(os.path.join(output_dir, "games_index.json")) as f:
+        index_data = json.load(f)
+
+    games = []
+    for entry in tqdm(index_data["games"], desc="Packing"):
+        with open(os.path.join(output_dir, entry["filename"])) as f:
+            games.append(json.load(f))
+
+    return write_game_pack(games, os.path.join(output_dir, PACK_FILENAME), dtype=dtype)
+
+
+def load_model():
+    # gensim is only needed when some word's embedding is not cached yet
+    import gensim.downloader as api
+    return api.load(MODEL_NAME)
 
 
 def main():
     INPUT_FILE = "extract/full_words.txt"
     OUTPUT_DIR = "data"
+    CACHE_DIR = "extract/embedding_cache"
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pack-only", action="store_true", help="only rebuild the game pack from existing JSON files")
+    parser.add_argument("--float16", action="store_true", help="quantize pack matrices to float16")
+    parser.add_argument("--incremental", action="store_true", help="only compute new or changed puzzles")
+    args = parser.parse_args()
+    pack_dtype = "float16" if args.float16 else "float32"
+
+    if args.pack_only:
+        print(f"Packed {create_game_pack(OUTPUT_DIR, pack_dtype)} games")
+        return
+
+    if args.incremental:
+        written, removed, total = extract_incremental(INPUT_FILE, OUTPUT_DIR, CACHE_DIR, load_model)
+        # A removed game must leave the pack too, not only the JSON files
+        if written or removed or not os.path.exists(os.path.join(OUTPUT_DIR, PACK_FILENAME)):
+            create_game_pack(OUTPUT_DIR, pack_dtype)
+        print(f"Wrote {written} new or changed games, removed {removed}, {total} in total")
+        return
     
     data = extract(INPUT_FILE)
-    model = api.load("fasttext-wiki-news-subwords-300")
-    missing_words = clean(data, model)
-    valid_games = create(data, model, OUTPUT_DIR)
+    words = {word.lower() for game in data for word in game}
+    model = load_embeddings(words, CACHE_DIR, load_model)
+    valid_games, missing_words = create(data, model, OUTPUT_DIR)
     create_games_index(valid_games, OUTPUT_DIR)
+    create_game_pack(OUTPUT_DIR, pack_dtype)
     
     print(f"Processed {len(valid_games)} games")
     if missing_words:
@@ -0,0 +1,166 @@
+import hashlib
+import os
+import sys
+
+import numpy as np
+from tqdm import tqdm
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend', 'app', 'services'))
+from ai_solver import AISolver
+
+GROUP_SIZE = 4
+NUM_GROUPS = 4
+NUM_STATES = 1 << NUM_GROUPS
+FORMAT_VERSION = 1
+
+
+def matrix_digest(adjacency_matrix):
+    return hashlib.sha1(np.asarray(adjacency_matrix, dtype=np.float64).tobytes()).hexdigest()
+
+
+class FeatureStore:
+    """Weight-independent features for simulating the solve loop.
+
+    For every game and every subset of already-found groups (a 4-bit mask)
+    it holds the conductance and density of each candidate combo, and which
+    group, if any, the combo is. Those values never depend on the weights, so
+    they are computed once and a simulation only has to rank scores.
+    """
+
+    def __init__(self, digests, conductance, density, labels, offsets):
+        self.digests = list(digests)
+        self.conductance = conductance
+        self.density = density
+        self.labels = labels
+        # offsets[g, state] .. offsets[g, state + 1] delimit a board state's combos
+        self.offsets = offsets
+        self._positions = {digest: i for i, digest in enumerate(self.digests)}
+
+    def __len__(self):
+        return len(self.digests)
+
+    @classmethod
+    def build(cls, corpus):
+        solver = AISolver()
+        digests, conductance, density, labels = [], [], [], []
+        offsets = np.zeros((len(corpus), NUM_STATES + 1), dtype=np.int64)
+        total = 0
+
+        for g, game_data in enumerate(tqdm(corpus, desc="Features", leave=False)):
+            matrix = np.array(game_data['adjacency_matrix'], dtype=np.float64)
+            n = len(matrix)
+            digests.append(matrix_digest(matrix))
+            group_of = np.arange(n) // GROUP_SIZE
+
+            for state in range(NUM_STATES):
+                offsets[g, state] = total
+                removed = np.isin(group_of, [k for k in range(NUM_GROUPS) if state >> k & 1])
+                if state == NUM_STATES - 1:
+                    continue
+
+                # Same -1 masking GeneticAlgorithm.solve_game applies to found words
+                masked = matrix.copy()
+                masked[removed, :] = -1
+                masked[:, removed] = -1
+                available = np.flatnonzero(~removed)
+
+                combos, cond, dens = solver.score_combinations(masked, available)
+                groups = group_of[combos]
+                is_group = (groups == groups[:, :1]).all(axis=1)
+
+                conductance.append(cond)
+                density.append(dens)
+                labels.append(np.where(is_group, groups[:, 0], -1).astype(np.int8))
+                total += len(combos)
+            offsets[g, NUM_STATES] = total
+
+        return cls(
+            digests,
+            np.concatenate(conductance) if conductance else np.zeros(0),
+            np.concatenate(density) if density else np.zeros(0),
+            np.concatenate(labels) if labels else np.zeros(0, dtype=np.int8),
+            offsets
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            if int(data['version']) != FORMAT_VERSION:
+                raise ValueError(f"{path} has feature store version {int(data['version'])}")
+            return cls(data['digests'].tolist(), data['conductance'], data['density'], data['labels'], data['offsets'])
+
+    @classmethod
+    def load_or_build(cls, corpus, path=None):
+        """Reuse the store at path if it covers the corpus, otherwise build it and save it there."""
+        if path and os.path.exists(path):
+            store = cls.load(path)
+            digests = [matrix_digest(game_data['adjacency_matrix']) for game_data in corpus]
+            if all(digest in store._positions for digest in digests):
+                return store.subset(digests)
+
+        store = cls.build(corpus)
+        if path:
+            store.save(path)
+        return store
+
+    def save(self, path):
+        tmp_path = f'{path}.tmp.npz'
+        np.savez(tmp_path, version=FORMAT_VERSION, digests=np.array(self.digests), conductance=self.conductance,
+                 density=self.density, labels=self.labels, offsets=self.offsets)
+        os.replace(tmp_path, path)
+
+    def subset(self, digests):
+        """Store restricted to the given games, in that order."""
+        positions = [self._positions[digest] for digest in digests]
+        if positions == list(range(len(self))):
+            return self
+
+        conductance, density, labels = [], [], []
+        offsets = np.zeros((len(positions), NUM_STATES + 1), dtype=np.int64)
+        total = 0
+        for g, p in enumerate(positions):
+            start, end = self.offsets[p, 0], self.offsets[p, NUM_STATES]
+            offsets[g] = self.offsets[p] - start + total
+            conductance.append(self.conductance[start:end])
+            density.append(self.density[start:end])
+            labels.append(self.labels[start:end])
+            total += end - start
+        return FeatureStore(digests, np.concatenate(conductance), np.concatenate(density), np.concatenate(labels), offsets)
+
+    def state(self, game, state):
+        start, end = self.offsets[game, state], self.offsets[game, state + 1]
+        return self.conductance[start:end], self.density[start:end], self.labels[start:end]
+
+    def simulate(self, game, weights, max_tries=100):
+        """Tries GeneticAlgorithm.solve_game would take on this game with these weights.
+
+        Within one board state the solver guesses strictly in ranked order (the
+        tried set is cleared whenever a group is found), so the tries spent there
+        are the rank of the best-placed correct group. That rank is counted
+        directly: combos scoring higher, plus equal scores earlier in
+        combination order, which is where a stable sort puts them.
+        """
+        state = 0
+        tries = 0
+        while state != NUM_STATES - 1:
+            conductance, density, labels = self.state(game, state)
+            scores = weights[0] * conductance + weights[1] * density
+
+            best_rank, best_group = None, None
+            for c in np.flatnonzero(labels >= 0):
+                rank = int(np.count_nonzero(scores > scores[c])) + int(np.count_nonzero(scores[:c] == scores[c]))
+                if best_rank is None or rank < best_rank:
+                    best_rank, best_group = rank, int(labels[c])
+
+            tries += best_rank + 1
+            if tries >= max_tries:
+                return max_tries
+            state |= 1 << best_group
+        return tries
+
+    def average_tries(self, weights, max_tries=100, games=None):
+        """Average over the first games games, all by default."""
+        count = len(self) if games is None else min(games, len(self))
+        if count == 0:
+            return float('inf')
+        return sum(self.simulate(g, weights, max_tries) for g in range(count)) / count
@@ -0,0 +1,57 @@
+import hashlib
+import json
+import os
+
+FORMAT_VERSION = 1
+
+
+def corpus_key(digests, mode='greedy'):
+    """Key for a set of games (by matrix digest) simulated in one solver mode; game order does not matter."""
+    joined = '\n'.join(sorted(digests)).encode('utf-8')
+    return f'{mode}:{hashlib.sha1(joined).hexdigest()}'
+
+
+def ratio_key(weights):
+    """Fitness only depends on the weights' ratio: scaling both scales every score and keeps the ranking."""
+    total = weights[0] + weights[1]
+    if total == 0:
+        return 'zero'
+    return f'{weights[1] / total:.12g}'
+
+
+class FitnessMemo:
+    """Average tries by (corpus key, weight ratio), kept in a JSON file across runs.
+
+    Reused by GeneticAlgorithm for the elite copy, duplicate children and any
+    ratio an earlier run already scored. Entries for different corpora and
+    modes never mix, because the corpus key covers both.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.entries = {}
+        if path and os.path.exists(path):
+            try:
+                with open(path) as f:
+                    data = json.load(f)
+                if data.get('version') == FORMAT_VERSION:
+                    self.entries = data['entries']
+            except (OSError, ValueError, KeyError) as e:
+                print(f"Ignoring fitness memo {path}: {e}")
+
+    def __len__(self):
+        return sum(len(ratios) for ratios in self.entries.values())
+
+    def get(self, key, weights):
+        return self.entries.get(key, {}).get(ratio_key(weights))
+
+    def put(self, key, weights, fitness):
+        self.entries.setdefault(key, {})[ratio_key(weights)] = fitness
+
+    def save(self):
+        if not self.path:
+            return
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({"version": FORMAT_VERSION, "entries": self.entries}, f)
+        os.replace(tmp_path, self.path)
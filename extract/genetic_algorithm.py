@@ -1,22 +1,80 @@
 import json
+import math
 import random
 import os
+import sys
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor
 from tqdm import tqdm
+from feature_store import FeatureStore, matrix_digest
+from fitness_memo import FitnessMemo, corpus_key, ratio_key
+from breakpoint_sweep import sweep_weights
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend', 'app', 'services'))
+from ai_solver import AISolver, guess_mask, MAX_ENUMERATED_COMBOS
+
+
+def load_corpus(game_files, data_dir='data'):
+    """Read every training game once; the list is shared with pool workers instead of re-read per evaluation"""
+    corpus = []
+    for game_file in game_files:
+        filepath = os.path.join(data_dir, game_file)
+        if not os.path.exists(filepath):
+            continue
+        with open(filepath, 'r') as f:
+            corpus.append(json.load(f))
+    return corpus
+
+
+# Set once per worker process by _init_worker. Under the default fork start
+# method the corpus is inherited copy-on-write rather than pickled per task.
+_worker_ga = None
+_worker_corpus = None
+
+
+def _init_worker(ga, corpus):
+    global _worker_ga, _worker_corpus
+    _worker_ga = ga
+    _worker_corpus = corpus
+
+
+def _worker_fitness(task):
+    weights, games = task
+    return _worker_ga.fitness(weights, _worker_corpus, games)
 
 
 class GeneticAlgorithm:
-    def __init__(self, population_size=50, mutation_rate=0.1, crossover_rate=0.7):
+    def __init__(self, population_size=50, mutation_rate=0.1, crossover_rate=0.7, seed=None, workers=1, mode='greedy',
+                 racing=False, race_min_games=10, race_keep=0.5):
         self.population_size = population_size
         self.mutation_rate = mutation_rate
         self.crossover_rate = crossover_rate
         self.population = []
+        self.workers = workers
+        # 'greedy' guesses the best single group, 'partition' the group most
+        # common among the best whole partitions of the remaining words
+        self.mode = mode
+        self.solver = None
+        # Successive halving: score everyone on race_min_games games, keep the
+        # best race_keep share, grow the subset by 1 / race_keep, and so on
+        # until the survivors play the whole corpus
+        self.racing = racing
+        self.race_min_games = race_min_games
+        self.race_keep = race_keep
+        # Set by evolve: fitness memo and the corpus's matrix digests, in corpus order
+        self.memo = FitnessMemo()
+        self.digests = []
+        # All randomness goes through this generator; fitness itself is
+        # deterministic, so a seed fixes the run whatever the worker count
+        self.rng = random.Random(seed)
         
     def initialize_population(self):
         """Create random initial population of weight pairs [w1, w2]"""
         self.population = []
         for _ in range(self.population_size):
-            w1 = random.random()
-            w2 = random.random()
+            w1 = self.rng.random()
+            w2 = self.rng.random()
             self.population.append([w1, w2])
     
     def calc_density(self, indices, adjacency_matrix):
@@ -38,7 +96,7 @@ class GeneticAlgorithm:
                     continue
                 
                 if j in indices:
-                    inside_connections += adjacency_matrix[i][j] / 4
+                    inside_connections += adjacency_matrix[i][j] / len(indices)
                 else:
                     outside_connections += adjacency_matrix[i][j]
         
@@ -62,34 +120,45 @@ class GeneticAlgorithm:
         backtrack(0, [])
         return result
     
-    def solve_game(self, game_data, weights, max_tries=100):
-        """Attempt to solve a game with given weights"""
+    def solve_game(self, game_data, weights, max_tries=100, mode=None):
+        """Attempt to solve a game with given weights
+        
+        Any board size works: groups are the consecutive runs of
+        game_data['group_size'] (default 4) word indices.
+        """
+        if (mode or self.mode) == 'partition':
+            return self.solve_game_partition(game_data, weights, max_tries)
+
         adjacency_matrix = [row[:] for row in game_data['adjacency_matrix']]
-        available_indices = list(range(16))
+        board_size = len(adjacency_matrix)
+        group_size = game_data.get('group_size', 4)
+        num_groups = board_size // group_size
+        available_indices = list(range(board_size))
         found_groups = 0
         tries = 0
         tried_suggestions = set()
         
-        correct_sets = [
-            set([0, 1, 2, 3]),
-            set([4, 5, 6, 7]),
-            set([8, 9, 10, 11]),
-            set([12, 13, 14, 15])
-        ]
+        correct_sets = [set(range(g * group_size, (g + 1) * group_size)) for g in range(num_groups)]
         
-        while found_groups < 4 and tries < max_tries:
+        while found_groups < num_groups and tries < max_tries:
             tries += 1
             
-            suggestions = []
-            combos = self.generate_combinations(available_indices, 4)
-            
-            for combo in combos:
-                conductance = self.calc_conductance(combo, adjacency_matrix)
-                density = self.calc_density(combo, adjacency_matrix)
-                score = weights[0] * conductance + weights[1] * density
-                suggestions.append({'words': combo, 'score': score})
-            
-            suggestions.sort(key=lambda x: x['score'], reverse=True)
+            if math.comb(len(available_indices), group_size) > MAX_ENUMERATED_COMBOS:
+                # Too many combinations to score one by one: search for the best untried one
+                if self.solver is None:
+                    self.solver = AISolver()
+                self.solver.weights = list(weights)
+                suggestions, _ = self.solver.search_top_k(adjacency_matrix, available_indices, 1,
+                                                          [list(key) for key in tried_suggestions], group_size)
+            else:
+                suggestions = []
+                for combo in self.generate_combinations(available_indices, group_size):
+                    conductance = self.calc_conductance(combo, adjacency_matrix)
+                    density = self.calc_density(combo, adjacency_matrix)
+                    score = weights[0] * conductance + weights[1] * density
+                    suggestions.append({'words': combo, 'score': score})
+                
+                suggestions.sort(key=lambda x: x['score'], reverse=True)
             
             filtered = [s for s in suggestions if tuple(sorted(s['words'])) not in tried_suggestions]
             if not filtered:
@@ -105,28 +174,64 @@ class GeneticAlgorithm:
                 found_groups += 1
                 available_indices = [i for i in available_indices if i not in guess]
                 for idx in guess:
-                    for i in range(16):
+                    for i in range(board_size):
                         adjacency_matrix[idx][i] = -1
                         adjacency_matrix[i][idx] = -1
                 tried_suggestions.clear()
             else:
                 tried_suggestions.add(guess_key)
         
-        return tries if found_groups == 4 else max_tries
+        return tries if found_groups == num_groups else max_tries
     
-    def fitness(self, weights, game_files, data_dir='data'):
-        """Calculate fitness as average number of tries across all games (lower is better)"""
-        total_tries = 0
-        games_count = 0
+    def solve_game_partition(self, game_data, weights, max_tries=100):
+        """solve_game in partition mode: each guess is AISolver.rank_partitions' top group"""
+        if self.solver is None:
+            self.solver = AISolver()
+        self.solver.weights = list(weights)
+        
+        adjacency_matrix = [row[:] for row in game_data['adjacency_matrix']]
+        board_size = len(adjacency_matrix)
+        group_size = game_data.get('group_size', 4)
+        num_groups = board_size // group_size
+        available_indices = list(range(board_size))
+        found_groups = 0
+        tries = 0
+        tried_masks = []
         
-        for game_file in game_files:
-            filepath = os.path.join(data_dir, game_file)
-            if not os.path.exists(filepath):
-                continue
+        while found_groups < num_groups and tries < max_tries:
+            tries += 1
             
-            with open(filepath, 'r') as f:
-                game_data = json.load(f)
+            # Wrong guesses are left out of every partition rather than skipped afterwards
+            top = self.solver.rank_partitions(adjacency_matrix, available_indices, exclude=tried_masks,
+                                              group_size=group_size).top(1)
+            if not top:
+                break
             
+            guess = sorted(top[0]['words'])
+            if guess[0] % group_size == 0 and guess == list(range(guess[0], guess[0] + group_size)):
+                found_groups += 1
+                available_indices = [i for i in available_indices if i not in guess]
+                for idx in guess:
+                    for i in range(board_size):
+                        adjacency_matrix[idx][i] = -1
+                        adjacency_matrix[i][idx] = -1
+                tried_masks = []
+            else:
+                tried_masks.append(guess_mask(guess))
+        
+        return tries if found_groups == num_groups else max_tries
+    
+    def fitness(self, weights, corpus, games=None):
+        """Calculate fitness as average number of tries across the first games games of the corpus, all by default (lower is better)"""
+        if isinstance(corpus, FeatureStore):
+            return corpus.average_tries(weights, games=games)
+        if games is not None:
+            corpus = corpus[:games]
+        
+        total_tries = 0
+        games_count = 0
+        
+        for game_data in corpus:
             tries = self.solve_game(game_data, weights)
             total_tries += tries
             games_count += 1
@@ -138,14 +243,14 @@ class GeneticAlgorithm:
     
     def tournament_selection(self, fitnesses, tournament_size=3):
         """Select parent using tournament selection"""
-        tournament_indices = random.sample(range(len(self.population)), tournament_size)
+        tournament_indices = self.rng.sample(range(len(self.population)), tournament_size)
         tournament_fitnesses = [fitnesses[i] for i in tournament_indices]
         winner_idx = tournament_indices[tournament_fitnesses.index(min(tournament_fitnesses))]
         return self.population[winner_idx]
     
     def crossover(self, parent1, parent2):
         """Single-point crossover"""
-        if random.random() < self.crossover_rate:
+        if self.rng.random() < self.crossover_rate:
             return [parent1[0], parent2[1]]
         return parent1[:]
     
@@ -153,30 +258,128 @@ class GeneticAlgorithm:
         """Mutate weights with small random changes"""
         mutated = individual[:]
         for i in range(len(mutated)):
-            if random.random() < self.mutation_rate:
-                mutated[i] += random.gauss(0, 0.1)
+            if self.rng.random() < self.mutation_rate:
+                mutated[i] += self.rng.gauss(0, 0.1)
                 mutated[i] = max(0, min(1, mutated[i]))  # Keep in [0, 1]
         return mutated
     
-    def evolve(self, game_files, generations=50, data_dir='data'):
+    def evaluate(self, individuals, corpus, games=None, executor=None, desc=None):
+        """Fitness of each individual on the first games games (all by default), through the memo
+        
+        Individuals sharing a weight ratio are evaluated once. Returns
+        (fitnesses, number of evaluations actually run).
+        """
+        key = corpus_key(self.digests[:games], self.mode)
+        fitnesses = [None] * len(individuals)
+        # ratio -> (weights, positions in individuals)
+        pending = {}
+        for i, individual in enumerate(individuals):
+            known = self.memo.get(key, individual)
+            if known is not None:
+                fitnesses[i] = known
+            else:
+                pending.setdefault(ratio_key(individual), (individual, []))[1].append(i)
+        
+        todo = list(pending.values())
+        if executor is None:
+            results = [self.fitness(weights, corpus, games) for weights, _ in tqdm(todo, desc=desc, leave=False)]
+        else:
+            chunksize = max(1, len(todo) // (self.workers * 4))
+            results = executor.map(_worker_fitness, [(weights, games) for weights, _ in todo], chunksize=chunksize)
+            results = list(tqdm(results, total=len(todo), desc=desc, leave=False))
+        
+        for (weights, positions), value in zip(todo, results):
+            self.memo.put(key, weights, value)
+            for i in positions:
+                fitnesses[i] = value
+        return fitnesses, len(todo)
+    
+    def evaluate_population(self, corpus, executor=None, desc=None):
+        """Selection keys of every individual, in population order, and the game simulations spent
+        
+        A key is (rungs short of the whole corpus, average tries), so
+        tournaments prefer anyone scored on the whole corpus over anyone
+        dropped earlier in a race, and otherwise compare tries.
+        """
+        if self.racing:
+            return self.race_population(corpus, executor, desc)
+        fitnesses, evaluated = self.evaluate(self.population, corpus, None, executor, desc)
+        return [(0, fitness) for fitness in fitnesses], evaluated * len(corpus)
+    
+    def race_population(self, corpus, executor=None, desc=None):
+        """evaluate_population by successive halving over growing prefixes of the corpus"""
+        rungs = []
+        games = self.race_min_games
+        while games < len(corpus):
+            rungs.append(games)
+            games = math.ceil(games / self.race_keep)
+        rungs.append(len(corpus))
+        
+        # Everyone races, even with a whole-corpus fitness on file, so a warm
+        # memo makes a run cheaper without changing who survives
+        keys = [None] * len(self.population)
+        spent = 0
+        alive = list(range(len(self.population)))
+        for rung, games in enumerate(rungs):
+            last = rung == len(rungs) - 1
+            fitnesses, evaluated = self.evaluate([self.population[i] for i in alive], corpus,
+                                                 None if last else games, executor, f"{desc} ({games} games)")
+            spent += evaluated * games
+            if last:
+                for i, fitness in zip(alive, fitnesses):
+                    keys[i] = (0, fitness)
+                break
+            
+            order = sorted(range(len(alive)), key=lambda j: fitnesses[j])
+            survivors = max(1, math.ceil(len(alive) * self.race_keep))
+            for j in order[survivors:]:
+                keys[alive[j]] = (len(rungs) - 1 - rung, fitnesses[j])
+            alive = sorted(alive[j] for j in order[:survivors])
+        return keys, spent
+    
+    def evolve(self, game_files, generations=50, data_dir='data', features_path=None, use_features=True, memo_path=None):
         """Run genetic algorithm for specified number of generations"""
+        corpus = load_corpus(game_files, data_dir)
+        if self.racing:
+            # Races use prefixes of the corpus, so put it in random order
+            self.rng.shuffle(corpus)
+        self.digests = [matrix_digest(game_data['adjacency_matrix']) for game_data in corpus]
+        self.memo = FitnessMemo(memo_path)
+        # The feature store replays the greedy solver on 16-word boards of four groups only
+        standard = all(len(game['words']) == 16 and game.get('group_size', 4) == 4 for game in corpus)
+        if use_features and self.mode == 'greedy' and standard:
+            corpus = FeatureStore.load_or_build(corpus, features_path)
+        executor = None
+        if self.workers > 1:
+            executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker, initargs=(self, corpus))
+        
+        try:
+            return self._evolve(corpus, generations, executor)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+    
+    def _evolve(self, corpus, generations, executor):
         self.initialize_population()
         
         best_individual = None
         best_fitness = float('inf')
         
         for generation in range(generations):
-            fitnesses = []
-            for individual in tqdm(self.population, desc=f"Gen {generation+1}/{generations}", leave=False):
-                fit = self.fitness(individual, game_files, data_dir)
-                fitnesses.append(fit)
+            started = time.perf_counter()
+            fitnesses, spent = self.evaluate_population(corpus, executor, desc=f"Gen {generation+1}/{generations}")
             
-            min_fitness = min(fitnesses)
-            if min_fitness < best_fitness:
-                best_fitness = min_fitness
-                best_individual = self.population[fitnesses.index(min_fitness)][:]
+            # The best key is always a whole-corpus fitness
+            best_key = min(fitnesses)
+            if best_key[1] < best_fitness:
+                best_fitness = best_key[1]
+                best_individual = self.population[fitnesses.index(best_key)][:]
             
-            print(f"Generation {generation+1}: Best fitness = {best_fitness:.2f} tries, Best weights = {best_individual}")
+            self.memo.save()
+            # Against scoring every individual on every game
+            baseline = len(self.population) * len(corpus)
+            print(f"Generation {generation+1}: Best fitness = {best_fitness:.2f} tries, Best weights = {best_individual}"
+                  f" | {spent}/{baseline} game evaluations, {baseline - spent} saved, {time.perf_counter() - started:.2f}s")
             
             new_population = []
             
@@ -194,16 +397,73 @@ class GeneticAlgorithm:
         return best_individual, best_fitness
 
 
+def run_sweep(training_files, data_dir, args):
+    """Exact breakpoint sweep over the weight ratio, timed against one GA fitness evaluation"""
+    print(f"Sweeping weight ratios on {len(training_files)} games")
+    store = FeatureStore.load_or_build(load_corpus(training_files, data_dir), args.features)
+    
+    start = time.perf_counter()
+    best_weights, best_fitness, (t_lo, t_hi) = sweep_weights(store)
+    sweep_seconds = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    store.average_tries(best_weights)
+    evaluation_seconds = time.perf_counter() - start
+    ga_seconds = evaluation_seconds * args.population * args.generations
+    
+    print(f"\nOptimal weights: {best_weights} (any ratio with t = w2 / (w1 + w2) in ({t_lo:.6g}, {t_hi:.6g}))")
+    print(f"Optimal fitness: {best_fitness:.2f} average tries")
+    print(f"Sweep took {sweep_seconds:.2f}s; {args.generations} x {args.population} GA evaluations "
+          f"would take ~{ga_seconds:.2f}s at {evaluation_seconds * 1000:.1f}ms each")
+
+
 def main():
-    data_dir = 'data'
-    all_files = [f for f in os.listdir(data_dir) if f.startswith('game_') and f.endswith('.json')]
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--data-dir', default='data')
+    parser.add_argument('--games', type=int, default=50, help='training sample size, 0 for every game')
+    parser.add_argument('--generations', type=int, default=20)
+    parser.add_argument('--population', type=int, default=30)
+    parser.add_argument('--workers', type=int, default=1, help='processes used to evaluate individuals')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--features', default='ga_features.npz', help='feature store file, reused across runs')
+    parser.add_argument('--no-features', action='store_true', help='simulate every guess with solve_game instead')
+    parser.add_argument('--optimizer', choices=['ga', 'sweep'], default='ga',
+                        help='sweep finds the exact optimal weight ratio instead of evolving')
+    parser.add_argument('--mode', choices=['greedy', 'partition'], default='greedy',
+                        help='partition guesses from the best whole partitions of the board (GA only)')
+    parser.add_argument('--memo', default='ga_fitness_memo.json',
+                        help="fitness memo file, reused across runs ('' keeps it in memory)")
+    parser.add_argument('--race', action='store_true',
+                        help='successive halving: only the best individuals on small game subsets play every game')
+    parser.add_argument('--race-min-games', type=int, default=10, help='games in the first racing round')
+    parser.add_argument('--race-keep', type=float, default=0.5, help='share of individuals kept after each round')
+    args = parser.parse_args()
+    if not 0 < args.race_keep < 1 or args.race_min_games < 1:
+        parser.error('--race-keep must be between 0 and 1 and --race-min-games at least 1')
+    if args.optimizer == 'sweep' and args.mode != 'greedy':
+        parser.error('--optimizer sweep only supports --mode greedy')
+    
+    data_dir = args.data_dir
+    all_files = sorted(f for f in os.listdir(data_dir) if f.startswith('game_') and f.endswith('.json'))
+    
+    rng = random.Random(args.seed)
+    if args.games and args.games < len(all_files):
+        training_files = rng.sample(all_files, args.games)
+    else:
+        training_files = all_files
     
-    training_files = random.sample(all_files, min(50, len(all_files)))
+    if args.optimizer == 'sweep':
+        run_sweep(training_files, data_dir, args)
+        return
     
-    print(f"Training on {len(training_files)} games")
+    print(f"Training on {len(training_files)} games with {args.workers} worker(s), {args.mode} mode")
     
-    ga = GeneticAlgorithm(population_size=30, mutation_rate=0.15, crossover_rate=0.7)
-    best_weights, best_fitness = ga.evolve(training_files, generations=20, data_dir=data_dir)
+    ga = GeneticAlgorithm(population_size=args.population, mutation_rate=0.15, crossover_rate=0.7,
+                          seed=args.seed, workers=args.workers, mode=args.mode,
+                          racing=args.race, race_min_games=args.race_min_games, race_keep=args.race_keep)
+    best_weights, best_fitness = ga.evolve(training_files, generations=args.generations, data_dir=data_dir,
+                                           features_path=args.features, use_features=not args.no_features,
+                                           memo_path=args.memo or None)
     
     print(f"\nFinal best weights: {best_weights}")
     print(f"Final best fitness: {best_fitness:.2f} average tries")
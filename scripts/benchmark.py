@@ -0,0 +1,259 @@
+"""Benchmarks for the solver and the API.
+
+    python scripts/benchmark.py                      # both layers, every game
+    python scripts/benchmark.py --layers solver --games 100
+    python scripts/benchmark.py --output bench.json
+    python scripts/benchmark.py --baseline bench.json --tolerance 0.15
+
+The solver layer replays the games in public/data through
+AISolver.generate_suggestions and the full solve loop (AISolver.autosolve).
+The API layer drives the Flask app through its test client with the games
+held in in-memory storage, or a running server with --url. Latencies are
+reported as milliseconds and throughput as per-second rates. Against a
+baseline, any *_ms or *_mb that grows, or *_per_sec that drops, by more
+than the tolerance is a regression and the script exits with status 1.
+"""
+import argparse
+import json
+import math
+import os
+import random
+import resource
+import sys
+import time
+import tracemalloc
+import urllib.error
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(ROOT, 'public', 'data')
+sys.path.insert(0, os.path.join(ROOT, 'backend'))
+
+
+def percentile(values, q):
+    # Nearest rank on the sorted samples
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+def summarize(seconds, total_seconds=None):
+    """Latency percentiles (ms) and call rate for a list of per-call durations."""
+    total_seconds = sum(seconds) if total_seconds is None else total_seconds
+    return {
+        "calls": len(seconds),
+        "mean_ms": 1000 * sum(seconds) / len(seconds) if seconds else 0.0,
+        "p50_ms": 1000 * percentile(seconds, 50),
+        "p90_ms": 1000 * percentile(seconds, 90),
+        "p99_ms": 1000 * percentile(seconds, 99),
+        "calls_per_sec": len(seconds) / total_seconds if total_seconds else 0.0
+    }
+
+
+def load_games(limit=None):
+    from app.services.game_pack import GamePack, PACK_FILENAME
+
+    pack_path = os.path.join(DATA_DIR, PACK_FILENAME)
+    games = []
+    if os.path.exists(pack_path):
+        pack = GamePack(pack_path)
+        games = [pack.get_game(game_number) for game_number in pack.game_numbers()]
+    else:
+        for filename in sorted(os.listdir(DATA_DIR)):
+            if filename.startswith('game_') and filename.endswith('.json'):
+                with open(os.path.join(DATA_DIR, filename)) as f:
+                    games.append(json.load(f))
+        games.sort(key=lambda game: game['game_number'])
+    return games[:limit] if limit else games
+
+
+def bench_solver(games, repeats=1):
+    from app.services.ai_solver import AISolver
+
+    solver = AISolver()
+    suggest_times = []
+    combos = 0
+    for _ in range(repeats):
+        for game in games:
+            available = list(range(len(game['words'])))
+            started = time.perf_counter()
+            solver.generate_suggestions(game['adjacency_matrix'], available)
+            suggest_times.append(time.perf_counter() - started)
+            combos += math.comb(len(available), 4)
+
+    solve_times = []
+    tries = []
+    for game in games:
+        started = time.perf_counter()
+        trajectory = solver.autosolve(game['adjacency_matrix'])
+        solve_times.append(time.perf_counter() - started)
+        solved = sum(1 for step in trajectory if step['group'] is not None) == len(game['words']) // 4
+        tries.append(len(trajectory) if solved else 100)
+
+    # Memory is traced on a separate pass; tracemalloc slows numpy allocations down too much to time under
+    tracemalloc.start()
+    for game in games:
+        solver.autosolve(game['adjacency_matrix'])
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    suggestions = summarize(suggest_times)
+    suggestions["combos_per_sec"] = combos / sum(suggest_times) if suggest_times else 0.0
+    solve_loop = summarize(solve_times)
+    solve_loop["average_tries"] = sum(tries) / len(tries) if tries else 0.0
+    return {
+        "games": len(games),
+        "generate_suggestions": suggestions,
+        "solve_loop": solve_loop,
+        "traced_peak_mb": peak / 2 ** 20
+    }
+
+
+class TestClientDriver:
+    """Requests through Flask's test client, with every game in in-memory storage."""
+
+    def __init__(self, games):
+        os.environ['GAME_STORAGE'] = 'memory'
+        from app import create_app
+        from app.services.storage import storage
+
+        storage.put_games(games)
+        self.client = create_app().test_client()
+
+    def get(self, path):
+        response = self.client.get(path)
+        return response.status_code, response.get_json()
+
+    def post(self, path, payload):
+        response = self.client.post(path, json=payload)
+        return response.status_code, response.get_json()
+
+
+class HttpDriver:
+    """Requests against a running server, e.g. flask run or serverless offline."""
+
+    def __init__(self, url):
+        self.url = url.rstrip('/')
+
+    def get(self, path):
+        return self._send(urllib.request.Request(self.url + path))
+
+    def post(self, path, payload):
+        request = urllib.request.Request(self.url + path, data=json.dumps(payload).encode('utf-8'),
+                                         headers={'Content-Type': 'application/json'}, method='POST')
+        return self._send(request)
+
+    def _send(self, request):
+        try:
+            with urllib.request.urlopen(request) as response:
+                return response.status, json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            return e.code, None
+
+
+def bench_api(driver, requests, seed=0):
+    rng = random.Random(seed)
+    timings = {"/random": [], "/check": [], "/solve": []}
+    errors = {path: 0 for path in timings}
+    dealt = []
+
+    def timed(path, call):
+        started = time.perf_counter()
+        status, body = call()
+        timings[path].append(time.perf_counter() - started)
+        if status != 200:
+            errors[path] += 1
+        return body
+
+    started = time.perf_counter()
+    for _ in range(requests):
+        game = timed("/random", lambda: driver.get('/api/games/random'))
+        if game:
+            dealt.append(game)
+        if not dealt:
+            continue
+        game = rng.choice(dealt)
+        game_number, seed_value = game['game_number'], game['seed']
+
+        guess = rng.sample(range(16), 4)
+        timed("/check", lambda: driver.post(f'/api/games/{game_number}/check',
+                                            {"guess_indices": guess, "seed": seed_value}))
+
+        # A random board state: some groups' worth of words gone, maybe a wrong guess
+        available = sorted(rng.sample(range(16), rng.choice([16, 16, 12, 8])))
+        payload = {"seed": seed_value, "available_indices": available}
+        if rng.random() < 0.3:
+            payload["bad_guesses"] = [rng.sample(available, 4)]
+        timed("/solve", lambda: driver.post(f'/api/games/{game_number}/solve', payload))
+    elapsed = time.perf_counter() - started
+
+    results = {}
+    for path, seconds in timings.items():
+        results[path] = summarize(seconds)
+        results[path]["errors"] = errors[path]
+    results["requests_per_sec"] = sum(len(seconds) for seconds in timings.values()) / elapsed if elapsed else 0.0
+    return results
+
+
+def compare(current, baseline, tolerance, prefix=''):
+    """Regressions as (metric, baseline, current) for every *_ms, *_mb or *_per_sec present in both."""
+    regressions = []
+    for key, base in baseline.items():
+        if key not in current:
+            continue
+        value = current[key]
+        name = f'{prefix}{key}'
+        if isinstance(base, dict) and isinstance(value, dict):
+            regressions.extend(compare(value, base, tolerance, name + '.'))
+        elif key.endswith(('_ms', '_mb')) and value > base * (1 + tolerance):
+            regressions.append((name, base, value))
+        elif key.endswith('_per_sec') and value < base * (1 - tolerance):
+            regressions.append((name, base, value))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the solver and the API.")
+    parser.add_argument('--layers', nargs='+', choices=['solver', 'api'], default=['solver', 'api'])
+    parser.add_argument('--games', type=int, default=0, help="Games to use (0 = all)")
+    parser.add_argument('--repeats', type=int, default=1, help="Passes over the games for generate_suggestions")
+    parser.add_argument('--requests', type=int, default=500, help="Rounds of /random, /check and /solve")
+    parser.add_argument('--url', help="Benchmark a running server instead of the test client")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="Write the results to this JSON file")
+    parser.add_argument('--baseline', help="Compare against results saved with --output")
+    parser.add_argument('--tolerance', type=float, default=0.10, help="Allowed relative slowdown")
+    args = parser.parse_args()
+
+    games = load_games(args.games)
+    results = {"python": sys.version.split()[0], "created": time.strftime('%Y-%m-%dT%H:%M:%S')}
+
+    if 'solver' in args.layers:
+        print(f"Solver: {len(games)} games...")
+        results["solver"] = bench_solver(games, args.repeats)
+    if 'api' in args.layers:
+        driver = HttpDriver(args.url) if args.url else TestClientDriver(games)
+        print(f"API: {args.requests} rounds against {args.url or 'the test client'}...")
+        results["api"] = bench_api(driver, args.requests, args.seed)
+    # ru_maxrss is in KiB on Linux
+    results["max_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        for name, base, value in regressions:
+            print(f"REGRESSION {name}: {base:.4g} -> {value:.4g}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond {args.tolerance:.0%} of {args.baseline}.")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,12 +1,29 @@
+import argparse
 import boto3
+import hashlib
 import json
 import os
+import random
+import sys
+import threading
 import time
-from decimal import Decimal
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 
 load_dotenv(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'backend', '.env'))
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend', 'app', 'services'))
+from game_item import COMPRESSIONS, encode_item
+from game_pack import GamePack, PACK_FILENAME
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'public', 'data')
+METADATA_GAME_NUMBER = -1
+BATCH_WRITE_LIMIT = 25
+DEFAULT_WORKERS = 8
+MAX_ATTEMPTS = 8
+THROTTLE_CODES = {'ProvisionedThroughputExceededException', 'ThrottlingException', 'RequestLimitExceeded'}
+
 def create_table(dynamodb):
     try:
         table = dynamodb.create_table(
@@ -36,47 +53,222 @@ def create_table(dynamodb):
         else:
             raise e
 
-def load_data(table):
-    data_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'public', 'data')
-    
-    if not os.path.exists(data_dir):
-        print(f"Data directory not found: {data_dir}")
+class DynamoTable:
+    """The loader's view of the real table.
+
+    Batch writes go through the low-level client, which unlike the resource
+    is safe to share between the writer threads.
+    """
+
+    def __init__(self, table):
+        self.table = table
+        self.name = table.name
+        self.client = table.meta.client
+        self._serializer = TypeSerializer()
+        self._deserializer = TypeDeserializer()
+
+    def content_hashes(self):
+        """game_number -> stored content_hash (None for items written before hashes existed)."""
+        hashes = {}
+        kwargs = {'ProjectionExpression': 'game_number, content_hash'}
+        while True:
+            response = self.table.scan(**kwargs)
+            for item in response.get('Items', []):
+                hashes[int(item['game_number'])] = item.get('content_hash')
+            if 'LastEvaluatedKey' not in response:
+                return hashes
+            kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    def batch_put(self, items):
+        """Write up to 25 items, returning the ones DynamoDB left unprocessed."""
+        requests = [{'PutRequest': {'Item': {key: self._serializer.serialize(value) for key, value in item.items()}}}
+                    for item in items]
+        response = self.client.batch_write_item(RequestItems={self.name: requests})
+        return [{key: self._deserializer.deserialize(value) for key, value in request['PutRequest']['Item'].items()}
+                for request in response.get('UnprocessedItems', {}).get(self.name, [])]
+
+    def put(self, item):
+        self.table.put_item(Item=item)
+
+class ThrottledError(Exception):
+    def __init__(self):
+        super().__init__('Simulated throttling')
+        self.response = {'Error': {'Code': 'ProvisionedThroughputExceededException'}}
+
+class InMemoryTable:
+    """Stand-in for DynamoTable that keeps items in a dict, for running the loader locally.
+
+    unprocessed_rate hands that fraction of each batch back unprocessed and
+    throttle_rate fails whole batch calls, so the retry path gets exercised.
+    """
+
+    def __init__(self, items=(), unprocessed_rate=0.0, throttle_rate=0.0, seed=None):
+        self.name = 'ConnectionsGames'
+        self.items = {int(item['game_number']): dict(item) for item in items}
+        self.unprocessed_rate = unprocessed_rate
+        self.throttle_rate = throttle_rate
+        self.batch_calls = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def content_hashes(self):
+        with self._lock:
+            return {game_number: item.get('content_hash') for game_number, item in self.items.items()}
+
+    def batch_put(self, items):
+        with self._lock:
+            self.batch_calls += 1
+            if self._rng.random() < self.throttle_rate:
+                raise ThrottledError()
+            unprocessed = []
+            for item in items:
+                if self._rng.random() < self.unprocessed_rate:
+                    unprocessed.append(item)
+                else:
+                    self.items[int(item['game_number'])] = dict(item)
+            return unprocessed
+
+    def put(self, item):
+        with self._lock:
+            self.items[int(item['game_number'])] = dict(item)
+
+def content_hash(item):
+    """Digest of everything stored for an item, so a changed item format counts as a change too."""
+    payload = {key: value for key, value in item.items() if key != 'content_hash'}
+    encoded = json.dumps(payload, sort_keys=True, separators=(',', ':'),
+                         default=lambda value: bytes(value).hex() if isinstance(value, (bytes, bytearray)) else str(value))
+    return hashlib.sha1(encoded.encode('utf-8')).hexdigest()
+
+def read_games(data_dir):
+    """Yield (source, game_data), from the game pack when one exists."""
+    pack_path = os.path.join(data_dir, PACK_FILENAME)
+    if os.path.exists(pack_path):
+        pack = GamePack(pack_path)
+        game_numbers = pack.game_numbers()
+        print(f"Found {len(game_numbers)} games in {PACK_FILENAME}.")
+        for game_number in game_numbers:
+            yield f"game {game_number}", pack.get_game(game_number)
+        pack.close()
         return
 
     files = [f for f in os.listdir(data_dir) if f.endswith('.json') and f.startswith('game_')]
-    print(f"Found {len(files)} games to upload.")
+    print(f"Found {len(files)} games.")
+    for filename in files:
+        with open(os.path.join(data_dir, filename), 'r') as f:
+            yield filename, json.load(f)
+
+def _error_code(error):
+    return getattr(error, 'response', {}).get('Error', {}).get('Code')
+
+def write_batch(store, items, max_attempts=MAX_ATTEMPTS):
+    """Write one batch, retrying unprocessed and throttled items with jittered exponential backoff.
+
+    Returns (written, retries, failed items).
+    """
+    pending = items
+    retries = 0
+    for attempt in range(max_attempts):
+        try:
+            pending = store.batch_put(pending)
+        except Exception as e:
+            if _error_code(e) not in THROTTLE_CODES:
+                print(f"Error writing games {[int(item['game_number']) for item in pending]}: {e}")
+                break
+        if not pending:
+            break
+        retries += 1
+        time.sleep(random.uniform(0, min(0.05 * 2 ** attempt, 5.0)))
+    return len(items) - len(pending), retries, pending
+
+def load_data(store, data_dir=DATA_DIR, workers=DEFAULT_WORKERS, force=False, compression='none'):
+    """Upload new or changed games and keep the -1 metadata item in sync; returns a summary dict.
+
+    Games are stored as format version 2 items (see game_item). Each item
+    carries a content_hash, and games whose hash already matches
+    the table are skipped, so re-running the loader writes nothing. Changed
+    games go out in 25-item batches spread over a thread pool.
+    """
+    if not os.path.exists(data_dir):
+        print(f"Data directory not found: {data_dir}")
+        return None
 
+    started = time.perf_counter()
+    existing = store.content_hashes()
     game_ids = []
+    changed = 0
+    batch = []
+    futures = []
 
-    with table.batch_writer() as batch:
-        for filename in files:
-            with open(os.path.join(data_dir, filename), 'r') as f:
-                game_data = json.load(f, parse_float=Decimal)
-                
-                if 'game_number' not in game_data:
-                    print(f"Skipping {filename}: missing game_number")
-                    continue
-
-                try:
-                    batch.put_item(Item=game_data)
-                    game_ids.append(int(game_data['game_number']))
-                    if len(game_ids) % 50 == 0:
-                        print(f"Uploaded {len(game_ids)} games...")
-                except Exception as e:
-                    print(f"Error uploading game {game_data['game_number']}: {e}")
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for source, game_data in read_games(data_dir):
+            if 'game_number' not in game_data:
+                print(f"Skipping {source}: missing game_number")
+                continue
 
-    try:
-        table.put_item(Item={
-            'game_number': -1,
-            'available_games': game_ids
-        })
-        print("Uploaded metadata.")
-    except Exception as e:
-        print(f"Error uploading metadata: {e}")
+            game_number = int(game_data['game_number'])
+            game_ids.append(game_number)
+            item = encode_item(game_data, compression)
+            item['content_hash'] = content_hash(item)
+            if not force and existing.get(game_number) == item['content_hash']:
+                continue
+
+            changed += 1
+            batch.append(item)
+            if len(batch) == BATCH_WRITE_LIMIT:
+                futures.append(executor.submit(write_batch, store, batch))
+                batch = []
+        if batch:
+            futures.append(executor.submit(write_batch, store, batch))
+        results = [future.result() for future in futures]
+
+    written = sum(result[0] for result in results)
+    retries = sum(result[1] for result in results)
+    failed = {int(item['game_number']) for result in results for item in result[2]}
+
+    # Games that failed to upload stay listed only if an older copy is in the table
+    available_games = sorted(game_number for game_number in game_ids if game_number not in failed or game_number in existing)
+    metadata = {'game_number': METADATA_GAME_NUMBER, 'available_games': available_games}
+    metadata['content_hash'] = content_hash(metadata)
+    metadata_updated = False
+    if force or existing.get(METADATA_GAME_NUMBER) != metadata['content_hash']:
+        try:
+            store.put(metadata)
+            metadata_updated = True
+        except Exception as e:
+            print(f"Error uploading metadata: {e}")
+
+    elapsed = time.perf_counter() - started
+    print(f"{changed} of {len(game_ids)} games new or changed; wrote {written} in {elapsed:.2f}s "
+          f"({written / elapsed:.1f} games/s) with {retries} retries, {len(failed)} failed.")
+    print("Updated metadata." if metadata_updated else "Metadata already up to date.")
+    return {
+        "games": len(game_ids),
+        "changed": changed,
+        "written": written,
+        "failed": sorted(failed),
+        "retries": retries,
+        "metadata_updated": metadata_updated,
+        "seconds": elapsed
+    }
 
 
 if __name__ == '__main__':
-    dynamodb = boto3.resource('dynamodb', region_name='us-east-1')
-    
-    table = create_table(dynamodb)
-    load_data(table)
+    parser = argparse.ArgumentParser(description="Upload games to the ConnectionsGames table.")
+    parser.add_argument('--data-dir', default=DATA_DIR)
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help="Writer threads")
+    parser.add_argument('--force', action='store_true', help="Rewrite every game even if its hash matches")
+    parser.add_argument('--compression', choices=COMPRESSIONS, default='none',
+                        help="Compress the stored matrix (zlib saves little on float32 cells)")
+    parser.add_argument('--in-memory', action='store_true',
+                        help="Load into an in-memory stand-in table that drops some writes, then load again")
+    args = parser.parse_args()
+
+    if args.in_memory:
+        store = InMemoryTable(unprocessed_rate=0.1, throttle_rate=0.05, seed=0)
+        load_data(store, args.data_dir, args.workers, args.force, args.compression)
+        # A second pass over the same data should find nothing to write
+        load_data(store, args.data_dir, args.workers, args.force, args.compression)
+    else:
+        dynamodb = boto3.resource('dynamodb', region_name='us-east-1')
+        table = create_table(dynamodb)
+        load_data(DynamoTable(table), args.data_dir, args.workers, args.force, args.compression)